@@ -2,10 +2,8 @@ import os
 import warnings
 # Suppress st.cache deprecation warnings from third-party libraries
 warnings.filterwarnings("ignore", message=".*st\\.cache.*is deprecated.*")
-import requests
 import urllib.parse
 import io
-import base64
 import ssl
 import time
 import html
@@ -15,9 +13,9 @@ except Exception:  # pragma: no cover
     _toml = None
 import uuid
 import json
+import hashlib
 from datetime import datetime
 import streamlit as st
-from streamlit_option_menu import option_menu
 import pandas as pd
 import sys
 import types
@@ -45,6 +43,8 @@ except Exception:
     create_connection = None  # type: ignore
 import threading
 import queue
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 try:
     from streamlit_cookies_manager import EncryptedCookieManager  # type: ignore
 except Exception:  # pragma: no cover
@@ -52,18 +52,27 @@ except Exception:  # pragma: no cover
 
 from lib.storage import ProductStore
 from lib.db_config import DatabaseConfig
-from lib.pdf_utils import extract_text_from_pdf, chunk_text
+from lib.pdf_utils import extract_and_chunk_cached
 from lib.retriever import Retriever
 from lib.pdf_metadata_repo import PdfMetadataRepository
+from lib.chat_history import ChatHistoryStore, Msg, user_key
 from dashboard import Dashboard
 # OAuth component will be lazy-imported inside the auth function to avoid NameError interruptions
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 PDF_DIR = os.path.join(DATA_DIR, "pdfs")
 TEXT_DIR = os.path.join(DATA_DIR, "texts")
+CHATS_DIR = os.path.join(DATA_DIR, "chats")
+# Number of persisted messages loaded back into a chat when it is opened
+CHAT_HISTORY_LIMIT = 200
 
-os.makedirs(PDF_DIR, exist_ok=True)
-os.makedirs(TEXT_DIR, exist_ok=True)
+@st.cache_resource(show_spinner=False)
+def _ensure_dirs() -> None:
+    """Create the data directories once per process rather than on every script run."""
+    os.makedirs(PDF_DIR, exist_ok=True)
+    os.makedirs(TEXT_DIR, exist_ok=True)
+
+_ensure_dirs()
 
 # Load optional custom config from .streamlit/config.toml
 CONFIG_TOML: Dict[str, Dict] = {}
@@ -92,19 +101,58 @@ def get_database_url() -> str:
 def get_database_engine(**kwargs):
     """Return a SQLAlchemy Engine built from the configured database URL.
 
-    Extra keyword arguments are passed directly to sqlalchemy.create_engine.
+    Without arguments the process-wide pooled engine is reused; extra keyword
+    arguments build a dedicated engine via sqlalchemy.create_engine.
     """
+    if not kwargs:
+        return DB_CONFIG.shared_engine()
     return DB_CONFIG.create_engine(**kwargs)
 
+@st.cache_resource(show_spinner=False)
 def get_pdf_metadata_repo() -> PdfMetadataRepository:
     """Return a PdfMetadataRepository bound to the configured database engine.
 
     This is read-only in the sense that callers should only use list/get
-    if they want to avoid mutating the database.
+    if they want to avoid mutating the database. Cached so the table check
+    in its constructor runs once per process.
     """
     engine = get_database_engine()
     return PdfMetadataRepository(engine)
 
+@st.cache_resource(show_spinner=False)
+def _http():
+    """Return a shared requests.Session so webhook and Google calls reuse pooled keep-alive connections."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=Retry(total=2, backoff_factor=0.2))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+@st.cache_resource(show_spinner=False)
+def _executor() -> ThreadPoolExecutor:
+    """Return the shared worker pool for long blocking jobs (PDF ingest, file cleanup) kept off the script thread."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="kb-worker")
+
+@st.cache_resource(show_spinner=False)
+def _http_executor() -> ThreadPoolExecutor:
+    """Return a separate pool for short HTTP calls (sign-in, token refresh/revoke, delete webhooks).
+
+    Kept apart from ``_executor()`` so minutes-long ingest jobs never queue ahead of them.
+    """
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="kb-http")
+
+def _remove_product_files(pids: List[str]) -> None:
+    """Delete the local PDF, chunk and index files for the given ids; missing files are ignored."""
+    for pid in pids:
+        for path in (Path(PDF_DIR, f"{pid}.pdf"), Path(TEXT_DIR, f"{pid}.json"), Path(TEXT_DIR, f"{pid}.idx.joblib")):
+            try:
+                path.unlink(missing_ok=True)
+            except Exception:
+                pass
+
 STATUS_LABELS = {
     0: "New",
     1: "Success",
@@ -136,6 +184,64 @@ def _enrich_rows_with_status_label(rows: List[Dict]) -> List[Dict]:
         filtered.append(r)
     return filtered
 
+@st.cache_data(ttl=60, max_entries=32, show_spinner=False)
+def _list_products(version: int = 0) -> List[Dict]:
+    """Return non-deleted Knowledgebase rows with status labels.
+
+    Cached so idle reruns skip the database. ``version`` is the process-wide
+    ``_store_version()``; call ``_bump_store_version()`` after any
+    create/edit/delete so every session's next read misses the cache.
+    """
+    return _enrich_rows_with_status_label(get_pdf_metadata_repo().list_all())
+
+@st.cache_data(ttl=60, max_entries=32, show_spinner=False)
+def _name_to_id(version: int = 0) -> Dict[str, str]:
+    """Knowledgebase name -> id map for the Aarya selector, cached with the product list."""
+    return {p["name"]: p["id"] for p in _list_products(version)}
+
+@st.cache_resource(show_spinner=False)
+def _store_version_state() -> Dict:
+    """Product-list version shared by all sessions, so cache keys never collide across them."""
+    return {"version": 0, "lock": threading.Lock()}
+
+def _store_version() -> int:
+    return _store_version_state()["version"]
+
+def _bump_store_version() -> None:
+    state = _store_version_state()
+    with state["lock"]:
+        state["version"] += 1
+
+# Upload webhook URL sources in priority order; each returns a value or None.
+_UPLOAD_SOURCES = (
+    lambda: (CONFIG_TOML.get("custom", {}) or {}).get("UPLOAD_WEBHOOK_URL"),
+    lambda: CONFIG_TOML.get("UPLOAD_WEBHOOK_URL"),
+    lambda: st.secrets.get("configurl") if hasattr(st, "secrets") else None,
+    lambda: st.secrets.get("upload_url") if hasattr(st, "secrets") else None,
+    lambda: os.environ.get("CONFIG_URL"),
+    lambda: os.environ.get("UPLOAD_WEBHOOK_URL"),
+)
+
+# Config lookups are re-resolved every few minutes so secrets/env edits are
+# picked up without clearing every cache in the process
+CONFIG_CACHE_TTL = 300
+
+@st.cache_resource(show_spinner=False, ttl=CONFIG_CACHE_TTL)
+def _get_upload_url() -> str:
+    """Return the first configured upload webhook URL, or "" if none is set.
+
+    Cached across reruns and sessions for CONFIG_CACHE_TTL seconds; call
+    ``_get_upload_url.clear()`` after a settings change to re-resolve at once.
+    """
+    for src in _UPLOAD_SOURCES:
+        try:
+            val = src()
+        except Exception:
+            val = None
+        if val:
+            return str(val).strip()
+    return ""
+
 def _get_ws_url() -> str:
     try:
         url = (str(
@@ -302,6 +408,8 @@ def _ws_send_message(ws_url: str, payload: Dict, debug: bool = False) -> Optiona
         return None
 
 # ---------------------- Auth Helpers ----------------------
+# Secrets and environment rarely change, so these reads are cached for CONFIG_CACHE_TTL
+@st.cache_resource(show_spinner=False, ttl=CONFIG_CACHE_TTL)
 def get_admin_password() -> str:
     # Prefer secrets, fallback to environment variable, then default
     val = None
@@ -376,10 +484,20 @@ def admin_login_form():
 
 
 # ---------------------- App Init ----------------------
-if "store" not in st.session_state:
-    st.session_state["store"] = ProductStore(DATA_DIR)
-if "retriever" not in st.session_state:
-    st.session_state["retriever"] = Retriever(TEXT_DIR)
+@st.cache_resource(show_spinner=False)
+def get_store() -> ProductStore:
+    """Return the process-wide ProductStore shared by all sessions."""
+    return ProductStore(DATA_DIR)
+
+@st.cache_resource(show_spinner=False)
+def get_retriever() -> Retriever:
+    """Return the process-wide Retriever so TF-IDF indexes are built once, not per session."""
+    return Retriever(TEXT_DIR)
+
+@st.cache_resource(show_spinner=False)
+def get_chat_store() -> ChatHistoryStore:
+    return ChatHistoryStore(CHATS_DIR)
+
 if "chat_histories" not in st.session_state:
     st.session_state["chat_histories"] = {}
 if "show_create_dialog" not in st.session_state:
@@ -403,6 +521,23 @@ try:
 except Exception:
     cookies = None
 
+
+def _cookie_digest(payload: str) -> bytes:
+    return hashlib.blake2s(payload.encode("utf-8")).digest()
+
+
+def _save_user_cookie(user: Dict) -> None:
+    """Persist the user to the encrypted cookie, skipping the encrypt+save when it is unchanged."""
+    if cookies is None:
+        return
+    payload = json.dumps(user)
+    digest = _cookie_digest(payload)
+    if st.session_state.get("_user_cookie_hash") == digest:
+        return
+    cookies["user"] = payload  # type: ignore
+    cookies.save()
+    st.session_state["_user_cookie_hash"] = digest
+
 # Handle logout via query param so we can place a Logout link in the toolbar overlay
 def _read_query_params() -> dict:
     """Return a normalized dict[str, list[str]] of query params for all Streamlit versions."""
@@ -440,11 +575,12 @@ def _clear_query_params():
             pass
 
 def _logout():
-    # Best-effort revoke Google access token
+    # Best-effort revoke Google access token on the HTTP pool so logout does not wait on Google
     try:
         token = st.session_state.get("google_access_token")
         if token:
-            requests.post(
+            _http_executor().submit(
+                _http().post,
                 "https://oauth2.googleapis.com/revoke",
                 data={"token": token},
                 timeout=5,
@@ -475,6 +611,12 @@ def _logout():
     for key in keys_to_clear:
         if key in st.session_state:
             st.session_state[key] = None if key == "user" or key == "google_access_token" else False
+    st.session_state.pop("google_token", None)
+    st.session_state.pop("_user_cookie_hash", None)
+    # Loaded chat histories belong to the user signing out
+    st.session_state["chat_histories"] = {}
+    st.session_state.pop("chat_render_n", None)
+    st.session_state.pop("pending_ws", None)
     # Set a flash query param so we can show an alert after rerun on the login screen
     try:
         st.query_params.clear()
@@ -486,13 +628,25 @@ def _logout():
             pass
     st.rerun()
 
+def _has_query_param(name: str) -> bool:
+    """Cheap membership check that avoids normalizing every query param."""
+    try:
+        return name in st.query_params
+    except Exception:
+        return name in _read_query_params()
+
 def _handle_logout_param():
+    # Fast path: almost every rerun has no logout param
+    if not _has_query_param("logout"):
+        return
     params = _read_query_params()
     has_logout = "logout" in params and ("1" in params.get("logout", []))
     if has_logout:
         _logout()
 
 def _handle_kb_action():
+    if not _has_query_param("kb_action"):
+        return
     params = _read_query_params()
     action = None
     pid = None
@@ -513,18 +667,7 @@ def _handle_kb_action():
                 cur = store.get(pid)
             except Exception:
                 cur = None
-            try:
-                upload_url = (str(
-                    (CONFIG_TOML.get("custom", {}) or {}).get("UPLOAD_WEBHOOK_URL")
-                    or CONFIG_TOML.get("UPLOAD_WEBHOOK_URL")
-                    or ((st.secrets.get("configurl") if hasattr(st, "secrets") else None))
-                    or st.secrets.get("upload_url")
-                    or os.environ.get("CONFIG_URL")
-                    or os.environ.get("UPLOAD_WEBHOOK_URL")
-                    or ""
-                )).strip()
-            except Exception:
-                upload_url = ""
+            upload_url = _get_upload_url()
             if not upload_url:
                 st.warning("Upload webhook URL not configured; delete webhook not sent.")
             if upload_url and cur:
@@ -540,10 +683,10 @@ def _handle_kb_action():
                         "created_by": cur.get("created_by", ""),
                         "created_at": cur.get("created_at", ""),
                         "updated_by": user_email,
-                        "updated_at": datetime.now().isoformat(timespec="seconds"),
+                        "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
                     }
                     st.info(f"Calling delete webhook: {upload_url}")
-                    _resp = requests.post(
+                    _resp = _http().post(
                         upload_url,
                         json=_payload,
                         timeout=20,
@@ -559,17 +702,9 @@ def _handle_kb_action():
                 except Exception:
                     st.warning("Failed to call delete webhook")
             # Removed: store.delete(pid) - using database only
-            try:
-                pdfp = os.path.join(PDF_DIR, f"{pid}.pdf")
-                if os.path.exists(pdfp): os.remove(pdfp)
-            except Exception:
-                pass
-            try:
-                chunkp = os.path.join(TEXT_DIR, f"{pid}.json")
-                if os.path.exists(chunkp): os.remove(chunkp)
-            except Exception:
-                pass
+            _executor().submit(_remove_product_files, [pid])
             st.success("Deleted 1 row.")
+            _bump_store_version()
             _clear_query_params()
             st.rerun()
 
@@ -577,7 +712,9 @@ _handle_logout_param()
 _handle_kb_action()
 
 # Restore user from cookie if session empty, but do NOT restore right after logout
-if not st.session_state.get("user") and cookies is not None and cookies.ready():
+# Decrypt and parse the cookie at most once per session; later reruns rely on session_state
+if not st.session_state.get("user") and not st.session_state.get("_user_restored") and cookies is not None and cookies.ready():
+    st.session_state["_user_restored"] = True
     _qp_restore = {}
     try:
         _qp_restore = _read_query_params()
@@ -588,6 +725,7 @@ if not st.session_state.get("user") and cookies is not None and cookies.ready():
         try:
             raw = cookies.get("user")
             if raw:
+                st.session_state["_user_cookie_hash"] = _cookie_digest(raw)
                 data = json.loads(raw)
                 if isinstance(data, dict) and data.get("email"):
                     st.session_state["user"] = {
@@ -601,21 +739,27 @@ if not st.session_state.get("user") and cookies is not None and cookies.ready():
 
 # Profile dropdown visibility is controlled by session flag and a transparent button overlay on the chip
 
-store: ProductStore = st.session_state["store"]
-retriever: Retriever = st.session_state["retriever"]
+store: ProductStore = get_store()
+retriever: Retriever = get_retriever()
 
 # Asset paths
 ASSETS_DIR = os.path.join(os.path.dirname(__file__), "assets")
 ICON_PATH = os.path.join(ASSETS_DIR, "6D_fav_icon.ico")
 LOGO_SVG_PATH = os.path.join(ASSETS_DIR, "logo.svg")
+APP_CSS_PATH = os.path.join(ASSETS_DIR, "app.css")
+LOGO1_SVG_PATH = os.path.join(ASSETS_DIR, "logo1.svg")
+
+@st.cache_resource(show_spinner=False)
+def _asset_exists(path: str) -> bool:
+    """Stat a bundled asset once per process; asset files do not change at runtime."""
+    return os.path.exists(path)
 
 # Page config with custom favicon if available
-page_icon = ICON_PATH if os.path.exists(ICON_PATH) else "📄"
+page_icon = ICON_PATH if _asset_exists(ICON_PATH) else "📄"
 st.set_page_config(page_title="Knowledgebase Dashboard", page_icon=page_icon, layout="wide", initial_sidebar_state="expanded")
 
 # Prefer native logo placement (goes into stLogoSpacer) — use logo.svg for navbar
-LOGO1_SVG_PATH = os.path.join(ASSETS_DIR, "logo1.svg")
-_chosen_logo_rel = "assets/logo.svg" if os.path.exists(LOGO_SVG_PATH) else ("assets/logo1.svg" if os.path.exists(LOGO1_SVG_PATH) else None)
+_chosen_logo_rel = "assets/logo.svg" if _asset_exists(LOGO_SVG_PATH) else ("assets/logo1.svg" if _asset_exists(LOGO1_SVG_PATH) else None)
 try:
     if st.session_state.get("user") and _chosen_logo_rel:
         st.logo(_chosen_logo_rel)
@@ -625,227 +769,20 @@ except Exception:
 # Simple header title (branding moved to sidebar) and global top title bar
 # Navbar logo uses st.logo (set above). Toolbar icon uses logo1 if present; fallback to logo.svg.
 _nav_logo_rel = _chosen_logo_rel
-_logo1_rel = "assets/logo1.svg" if os.path.exists(LOGO1_SVG_PATH) else _nav_logo_rel
+_logo1_rel = "assets/logo1.svg" if _asset_exists(LOGO1_SVG_PATH) else _nav_logo_rel
 
 # (Removed separate in-body top title bar; title will be rendered in the toolbar itself)
 
-# Global CSS for a more professional look
-st.markdown(
-    """
-    <style>
-      :root {
-        --accent: #2563eb;
-        --bg-card: #ffffff;
-        --border: #e5e7eb;
-        --sidebar-bg: #f3f5f9;
-        --sidebar-text: #1f2937;
-      }
-      html, body, [data-testid="stAppViewContainer"], [data-testid="stSidebar"] {
-        font-family: -apple-system, BlinkMacSystemFont, Segoe UI, Roboto, Helvetica, Arial, "Apple Color Emoji", "Segoe UI Emoji", "Segoe UI Symbol", sans-serif;
-      }
-      /* Tweak padding: keep left/right as default; set only top to 1px */
-      .st-emotion-cache-liupi { padding-top: 1px !important; }
-      /* Main block container (stable selector) */
-      div[data-testid='stMainBlockContainer'] { padding-top: 1px !important; }
-      /* Fallback for older versions */
-      section.main > div.block-container { padding-top: 1px !important; }
-      /* Hide Deploy button in toolbar */
-      div[data-testid='stAppDeployButton'] { display: none !important; }
-      /* Hide Streamlit MainMenu (cover multiple versions/selectors) */
-      div[data-testid="stMainMenu"], #MainMenu { display: none !important; visibility: hidden !important; }
-      /* Put title into Streamlit's top toolbar and allow right-side chip */
-      div[data-testid="stToolbar"] { position: relative; overflow: visible; padding-right: 180px; }
-      /* Prevent Streamlit toolbar actions from intercepting clicks over our chip */
-      div[data-testid="stToolbarActions"] { pointer-events: none !important; }
-      .tb-chip, .tb-profile, .tb-profile-menu { pointer-events: auto; }
-      /* Native menu styles */
-      details.tb-profile-menu { position: fixed; top: 8px; right: 16px; z-index: 2147483647; }
-      details.tb-profile-menu > summary { list-style: none; display: inline-block; cursor: pointer; }
-      details.tb-profile-menu > summary::-webkit-details-marker { display: none; }
-      details.tb-profile-menu .chip { display:flex; align-items:center; gap:8px; background:#fff; border:1px solid #e5e7eb; border-radius:9999px; padding:4px 10px; box-shadow: 0 1px 2px rgba(0,0,0,0.06); cursor: pointer; }
-      details.tb-profile-menu[open] .chip { box-shadow: 0 6px 18px rgba(0,0,0,0.12); }
-      details.tb-profile-menu .avatar { width:24px; height:24px; border-radius:50%; display:flex; align-items:center; justify-content:center; font-size:13px; background:#e5e7eb; color:#374151; overflow:hidden; }
-      details.tb-profile-menu .avatar img { width:100%; height:100%; object-fit: cover; display:block; }
-      details.tb-profile-menu .name span { font-size:13px; color:#111827; max-width: 180px; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; display:block; }
-      details.tb-profile-menu .menu { position: fixed; top: 44px; right: 16px; z-index: 2147483651; background:#fff; border:1px solid #e5e7eb; border-radius:12px; box-shadow:0 8px 24px rgba(0,0,0,0.12); min-width: 260px; max-width: 320px; overflow:hidden; }
-      details.tb-profile-menu .menu .row { display:flex; align-items:center; gap:12px; padding: 12px 14px; }
-      details.tb-profile-menu .menu .row + .row { border-top: 1px solid #f1f5f9; }
-      details.tb-profile-menu .menu .avatar-xl { width:40px; height:40px; border-radius:50%; background:#e5e7eb; color:#374151; display:flex; align-items:center; justify-content:center; font-size:16px; overflow:hidden; }
-      details.tb-profile-menu .menu .name { font-weight:600; color:#111827; }
-      details.tb-profile-menu .menu .email { font-size:12px; color:#6b7280; }
-      details.tb-profile-menu .menu .logout-btn { margin-left:auto; color:#ef4444; text-decoration:none; font-size:13px; }
-      details.tb-profile-menu .menu .logout-btn:hover { text-decoration: underline; }
-      /* Toolbar left icon (logo1) */
-      div[data-testid="stToolbar"]::before {
-        content: "";
-        position: absolute;
-        left: 16px;
-        top: 50%;
-        transform: translateY(-50%);
-        width: 18px;
-        height: 18px;
-        background-image: url('assets/logo1.svg');
-        background-repeat: no-repeat;
-        background-size: contain;
-      }
-      div[data-testid="stToolbar"]::after {
-        content: "Knowledgebase Dashboard";
-        position: absolute;
-        left: 50%;
-        top: 50%;
-        transform: translate(-50%, -50%);
-        font-weight: 600;
-        font-size: 14px;
-        color: #111827;
-        letter-spacing: 0.2px;
-        pointer-events: none;
-        max-width: calc(100% - 500px); /* avoid overlap with right-side toolbar icons */
-        white-space: nowrap;
-        overflow: hidden;
-        text-overflow: ellipsis;
-      }
-      /* When sidebar is collapsed, title stays centered */
-      [data-testid="stSidebar"][aria-expanded="false"] ~ [data-testid="stAppViewContainer"] div[data-testid="stToolbar"]::after {
-        left: 50%;
-        transform: translate(-50%, -50%);
-      }
-      .app-card {
-        background: var(--bg-card);
-        border: 1px solid var(--border);
-        border-radius: 12px;
-        padding: 16px 18px;
-        box-shadow: 0 1px 2px rgba(0,0,0,0.03);
-        margin-bottom: 16px;
-      }
-      .app-section-title {
-        margin: 0 0 12px 0;
-        font-size: 1.1rem;
-        font-weight: 600;
-      }
-      .app-muted { color: #6b7280; }
-      .stButton>button[kind="primary"], .stButton>button {
-        border-radius: 8px !important;
-        padding: 0.5rem 0.9rem !important;
-        width: auto !important;
-        max-width: none !important;
-        white-space: nowrap !important;
-        display: inline-flex !important;
-        align-items: center !important;
-      }
-      /* Remove extra outer spacing around action buttons (Create/Clear/Save/Delete) */
-      div.element-container.st-key-kb_ce_new_clear,
-      div.element-container.st-key-kb_ce_new_submit,
-      div.element-container[class*="st-key-kb_ce_save_"],
-      div.element-container[class*="st-key-kb_ce_clear_"],
-      div.element-container[class*="st-key-kb_delete_pdf_"] {
-        margin: 0 !important;
-        padding: 0 !important;
-      }
-      /* Tighten the action row columns containing these buttons */
-      /* Applies where our two/three-column action bars are rendered */
-      [data-testid="stHorizontalBlock"] .stButton { margin: 0 !important; }
-      [data-testid="stHorizontalBlock"] { gap: 0 !important; }
-      /* Ensure columns that HOLD our action buttons do not get forced widths */
-      [data-testid="stColumn"]:has(.st-key-kb_ce_new_clear),
-      [data-testid="stColumn"]:has(.st-key-kb_ce_new_submit),
-      [data-testid="stColumn"]:has([class*="st-key-kb_ce_save_"]),
-      [data-testid="stColumn"]:has([class*="st-key-kb_ce_clear_"]),
-      [data-testid="stColumn"]:has([class*="st-key-kb_delete_pdf_"]) {
-        width: auto !important;
-        flex: 0 0 auto !important;
-      }
-      /* Hide Streamlit spinners and running indicators */
-      div[data-testid="stSpinner"],
-      .stSpinner,
-      div[aria-live="polite"][data-baseweb="notification"] {
-        display: none !important;
-        visibility: hidden !important;
-        opacity: 0 !important;
-      }
-      /* Sidebar radio spacing */
-      section[data-testid="stSidebar"] label { margin-bottom: 4px; }
-
-      /* Sidebar look & option-menu polish */
-      section[data-testid="stSidebar"] {
-        background: var(--sidebar-bg);
-        background-image: none !important; /* remove theme gradients */
-      }
-      /* Make option_menu UL fully transparent to inherit sidebar background */
-      section[data-testid="stSidebar"] ul.nav,
-      section[data-testid="stSidebar"] ul.nav.nav-pills,
-      section[data-testid="stSidebar"] ul.nav.nav-pills * {
-        background: transparent !important;
-        box-shadow: none !important;
-        border: 0 !important;
-      }
-      section[data-testid="stSidebar"] ul.nav { margin: 0 !important; padding: 0 !important; border-radius: 0 !important; }
-      section[data-testid="stSidebar"] ul.nav > li { margin: 0 !important; }
-      /* Keep selected item highlight while base stays unified */
-      section[data-testid="stSidebar"] ul.nav > li > a.nav-link.active {
-        background-color: #eaf2ff !important;
-        color: #111827 !important;
-      }
-      /* Remove inner padding so menu spans full width */
-      section[data-testid="stSidebar"] .block-container { padding: 0 !important; }
-      section[data-testid="stSidebar"] .block-container > div { margin: 0 !important; padding: 0 !important; background: var(--sidebar-bg) !important; }
-      /* Sidebar width */
-      div[data-testid="stSidebar"] {
-        min-width: 260px; /* fallback */
-        width: 260px;
-      }
-      .nav-brand { position: sticky; top: 0; z-index: 10; margin: -14px 0 0 0; padding: 0 4px 4px 4px; display: none; }
-      .brand-logo { display: flex; align-items: center; line-height: 0; }
-      .brand-logo svg { height: 20px; width: auto; display: block; margin: 0; padding: 0; transform: translateY(4px); }
-      .nav-logo { filter: none; }
-      .nav-divider { height: 1px; background: var(--border); margin: 8px 0 12px 0; }
-      .nav-clean ul.nav { gap: 2px; padding-left: 0 !important; }
-      .nav-clean a.nav-link {
-        color: var(--sidebar-text) !important;
-        border-radius: 10px;
-        white-space: nowrap;
-        overflow: hidden;
-        text-overflow: ellipsis;
-        transition: background 120ms ease, color 120ms ease;
-      }
-      .nav-clean a.nav-link:hover { background: #eef3ff !important; }
-      .nav-clean a.nav-link.active {
-        background: #eaf2ff !important;
-        font-weight: 600 !important;
-        box-shadow: inset 3px 0 0 0 var(--accent);
-        color: #0f172a !important;
-      }
-      .nav-clean i { font-size: 16px !important; }
-      /* Inline brand fallback (guaranteed render) */
-      .nav-inline-brand { display:flex; align-items:center; height:44px; padding: 0 8px 0 10px; margin: 0 0 6px 0; }
-      .nav-inline-brand svg { height:22px; width:auto; display:block; }
-      /* Chat UI polish */
-      .chat-ts { text-align: right; color: #6b7280; font-size: 12px; }
-      .chip { display:none; }
-      .stButton { margin: 0 !important; }
-      .bubble-user { background:#ffffff; border:1px solid #e5e7eb; border-radius: 12px; padding:10px 12px; margin-bottom:6px; }
-      .bubble-assistant { background:#ffffff; border:1px solid #dbe4ff; border-radius: 12px; padding:10px 12px; margin-bottom:6px; }
-      .assistant-msg-wrapper { background:#ffffff; border:1px solid #dbe4ff; border-radius: 12px; padding:10px 12px; margin-bottom:6px; }
-      .assistant-msg-wrapper p:first-child { margin-top: 0; }
-      .assistant-msg-wrapper p:last-child { margin-bottom: 0; }
-      .assistant-msg-wrapper ul, .assistant-msg-wrapper ol { margin: 0.5em 0; }
-      .assistant-msg-wrapper code { background: #e0e7ff; padding: 2px 6px; border-radius: 4px; }
-      .assistant-msg-wrapper pre { background: #e0e7ff; padding: 8px; border-radius: 6px; overflow-x: auto; }
-      .meta-row { font-size:12px; color:#6b7280; margin-top:2px; }
-      .msg-header { display:flex; align-items:center; gap:8px; font-weight:600; margin: 2px 0 6px 0; }
-      .msg-header.right { justify-content: flex-end; }
-      .avatar { width:24px; height:24px; border-radius:50%; display:flex; align-items:center; justify-content:center; font-size:14px; }
-      .avatar-user { background:#e5e7eb; color:#374151; }
-      .avatar-assistant { background:#dbe4ff; color:#1d4ed8; }
-      .name { font-size:13px; color:#111827; }
-      /* Reduce spacing between components in Aarya page */
-      .element-container { margin-bottom: 0.25rem !important; }
-      div[data-testid="column"] { gap: 0.25rem !important; }
-      div[data-testid="stVerticalBlock"] > div { gap: 0.25rem !important; }
-      div[data-testid="stVerticalBlock"] { gap: 0.25rem !important; }
-    </style>
-    """,
-    unsafe_allow_html=True,
-)
+# Global CSS for a more professional look (assets/app.css, read once per process)
+@st.cache_resource(show_spinner=False)
+def _app_css() -> str:
+    try:
+        with open(APP_CSS_PATH, "r", encoding="utf-8") as f:
+            return f.read()
+    except Exception:
+        return ""
+
+st.markdown(f"<style>\n{_app_css()}</style>", unsafe_allow_html=True)
 
 # Ensure toolbar icon uses logo1 (fallbacks to navbar logo) without touching the large CSS block
 if _logo1_rel:
@@ -894,6 +831,7 @@ if _logo1_rel:
 # (Removed external icon dependency for reactions; no like/dislike buttons shown)
 
 # ----- Google OAuth helpers (placed before first use) -----
+@st.cache_resource(show_spinner=False, ttl=CONFIG_CACHE_TTL)
 def _get_google_cfg():
     cid = st.secrets.get("google", {}).get("client_id") if hasattr(st, "secrets") else None
     csec = st.secrets.get("google", {}).get("client_secret") if hasattr(st, "secrets") else None
@@ -904,10 +842,131 @@ def _get_google_cfg():
     return cid, csec, redir
 
 
+GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
+# Access tokens within this many seconds of expiry are refreshed in the background
+GOOGLE_TOKEN_STALE_SECS = 300
+# After a failed refresh, wait this long before trying again
+GOOGLE_REFRESH_BACKOFF_SECS = 60
+
+
+def _store_google_token(tok: Dict) -> None:
+    """Keep the OAuth token response with an absolute expiry for the fresh/stale/expired check."""
+    st.session_state["google_token"] = {
+        "access_token": tok.get("access_token"),
+        "refresh_token": tok.get("refresh_token"),
+        "expires_at": time.time() + float(tok.get("expires_in") or 3600),
+        "refreshing": False,
+        "retry_after": 0.0,
+    }
+    st.session_state["google_token_lock"] = threading.Lock()
+    st.session_state["google_access_token"] = tok.get("access_token")
+
+
+def _refresh_google_token(state: Dict, lock, cid: str, csec: str, http) -> None:
+    """Exchange the refresh token for a new access token, updating ``state`` in place.
+
+    Runs on the worker pool, so it only touches the dict it was handed and
+    never session_state itself. A rejected refresh token is dropped; any other
+    failure records a backoff so the next rerun does not retry immediately.
+    """
+    try:
+        resp = http.post(
+            GOOGLE_TOKEN_URL,
+            data={
+                "client_id": cid,
+                "client_secret": csec,
+                "refresh_token": state.get("refresh_token"),
+                "grant_type": "refresh_token",
+            },
+            timeout=10,
+        )
+        data = resp.json()
+        if data.get("access_token"):
+            with lock:
+                state["access_token"] = data["access_token"]
+                state["expires_at"] = time.time() + float(data.get("expires_in") or 3600)
+        elif data.get("error") == "invalid_grant":
+            with lock:
+                state["refresh_token"] = None
+        else:
+            with lock:
+                state["retry_after"] = time.time() + GOOGLE_REFRESH_BACKOFF_SECS
+    except Exception:
+        with lock:
+            state["retry_after"] = time.time() + GOOGLE_REFRESH_BACKOFF_SECS
+    finally:
+        with lock:
+            state["refreshing"] = False
+
+
+def _get_google_access_token() -> Optional[str]:
+    """Return the current Google access token, refreshing it ahead of expiry.
+
+    Fresh tokens are returned as-is. Stale or expired tokens are returned
+    while a single background refresh runs on the HTTP pool; the script
+    thread never waits on the token endpoint.
+    """
+    state = st.session_state.get("google_token")
+    if not state:
+        return st.session_state.get("google_access_token")
+    now = time.time()
+    if (
+        state["expires_at"] - now <= GOOGLE_TOKEN_STALE_SECS
+        and state.get("refresh_token")
+        and now >= state.get("retry_after", 0.0)
+    ):
+        lock = st.session_state["google_token_lock"]
+        with lock:
+            start = not state["refreshing"]
+            state["refreshing"] = True
+        if start:
+            cid, csec, _ = _get_google_cfg()
+            _http_executor().submit(_refresh_google_token, state, lock, cid, csec, _http())
+    st.session_state["google_access_token"] = state["access_token"]
+    return state["access_token"]
+
+
+GOOGLE_USERINFO_URL = "https://openidconnect.googleapis.com/v1/userinfo"
+
+
+def _fetch_userinfo(http, access_token: str) -> Dict:
+    return http.get(GOOGLE_USERINFO_URL, headers={"Authorization": f"Bearer {access_token}"}, timeout=10).json()
+
+
+@st.fragment(run_every=0.5)
+def _await_userinfo():
+    """Poll the background userinfo request and complete the sign-in when it returns."""
+    pending = st.session_state.get("pending_userinfo")
+    if not pending:
+        return
+    fut = pending["future"]
+    if not fut.done():
+        st.caption("Signing you in...")
+        return
+    del st.session_state["pending_userinfo"]
+    try:
+        ui = fut.result()
+        st.session_state["user"] = {
+            "email": ui.get("email"),
+            "name": ui.get("name") or ui.get("email"),
+            "picture": ui.get("picture"),
+            "sub": ui.get("sub"),
+        }
+        _store_google_token(pending["token"])
+        # Persist to cookie
+        try:
+            _save_user_cookie(st.session_state["user"])
+        except Exception:
+            pass
+    except Exception:
+        st.session_state["google_login_failed"] = True
+    st.rerun()
+
+
 def _render_auth():
     cid, csec, redir = _get_google_cfg()
     auth_url = "https://accounts.google.com/o/oauth2/v2/auth"
-    token_url = "https://oauth2.googleapis.com/token"
+    token_url = GOOGLE_TOKEN_URL
     revoke_url = "https://oauth2.googleapis.com/revoke"
     if not st.session_state.get("user"):
         if cid and csec and redir:
@@ -917,7 +976,13 @@ def _render_auth():
                 # Lazy import to avoid NameError if the package isn't ready yet
                 from streamlit_oauth import OAuth2Component  # type: ignore
                 oauth2 = OAuth2Component(cid, csec, auth_url, token_url, token_url, revoke_url)
-                result = oauth2.authorize_button("Sign In with Sixdee Mail", redir, scope="openid email profile", key="google")
+                result = oauth2.authorize_button(
+                    "Sign In with Sixdee Mail",
+                    redir,
+                    scope="openid email profile",
+                    key="google",
+                    extras_params={"access_type": "offline"},
+                )
             except Exception:
                 had_error = True
             # Show fallback link only if button failed
@@ -932,40 +997,46 @@ def _render_auth():
                 }
                 qs = urllib.parse.urlencode(params, quote_via=urllib.parse.quote)
                 st.link_button("Sign in with Sixdee mail (fallback)", f"{auth_url}?{qs}")
-            if result and isinstance(result, dict) and result.get("token"):
+            if st.session_state.pop("google_login_failed", False):
+                st.error("Google login failed")
+            if result and isinstance(result, dict) and result.get("token") and "pending_userinfo" not in st.session_state:
                 try:
                     tk = result["token"]["access_token"]
-                    ui = requests.get("https://openidconnect.googleapis.com/v1/userinfo", headers={"Authorization": f"Bearer {tk}"}, timeout=10).json()
-                    st.session_state["user"] = {
-                        "email": ui.get("email"),
-                        "name": ui.get("name") or ui.get("email"),
-                        "picture": ui.get("picture"),
-                        "sub": ui.get("sub"),
+                    # Fetch the profile on the worker pool; _await_userinfo finishes the sign-in
+                    st.session_state["pending_userinfo"] = {
+                        "future": _http_executor().submit(_fetch_userinfo, _http(), tk),
+                        "token": result["token"],
                     }
-                    st.session_state["google_access_token"] = tk
-                    # Persist to cookie
-                    try:
-                        if cookies is not None:
-                            cookies["user"] = json.dumps(st.session_state["user"])  # type: ignore
-                            cookies.save()
-                    except Exception:
-                        pass
-                    st.rerun()
                 except Exception:
                     st.error("Google login failed")
+            if "pending_userinfo" in st.session_state:
+                _await_userinfo()
         else:
             st.error("Google login is not configured. Set google.client_id, google.client_secret and google.redirect_uri in secrets.")
     else:
         u = st.session_state["user"] or {}
         cols = st.columns([1,3,2])
         with cols[0]:
-            st.markdown(f"<div class='avatar avatar-user' title='{u.get('email','')}'>{(u.get('name','?') or '?')[:1]}</div>", unsafe_allow_html=True)
+            st.markdown(f"<div class='avatar avatar-user' title='{html.escape(u.get('email') or '', quote=True)}'>{html.escape((u.get('name','?') or '?')[:1])}</div>", unsafe_allow_html=True)
         with cols[1]:
             st.markdown(f"**{u.get('name','User')}**\n\n{u.get('email','')}")
         with cols[2]:
             if st.button("Logout", use_container_width=True):
                 _logout()
 
+def _login_logo_data_uri() -> str:
+    """Return the login logo as a base64 data URI, or "" if no logo is available."""
+    import base64
+    try:
+        path = LOGO1_SVG_PATH if _asset_exists(LOGO1_SVG_PATH) else (LOGO_SVG_PATH if _asset_exists(LOGO_SVG_PATH) else None)
+        if not path:
+            return ""
+        with open(path, "rb") as _f:
+            _b64 = base64.b64encode(_f.read()).decode("ascii")
+        return f"data:image/svg+xml;base64,{_b64}"
+    except Exception:
+        return ""
+
 # -------- Auth gate: require Google login before showing the app --------
 if not st.session_state.get("user"):
     # Hide sidebar and toolbar title; center a login card
@@ -1239,15 +1310,7 @@ if not st.session_state.get("user"):
     # Login card UI
     st.markdown("<div class='login-card'>", unsafe_allow_html=True)
     # Top logo in orange circle using embedded data URI for reliability
-    _logo_src = ""
-    try:
-        path = LOGO1_SVG_PATH if os.path.exists(LOGO1_SVG_PATH) else (LOGO_SVG_PATH if os.path.exists(LOGO_SVG_PATH) else None)
-        if path:
-            with open(path, "rb") as _f:
-                _b64 = base64.b64encode(_f.read()).decode("ascii")
-                _logo_src = f"data:image/svg+xml;base64,{_b64}"
-    except Exception:
-        _logo_src = ""
+    _logo_src = _login_logo_data_uri()
     st.markdown(f"<div class='login-logo'><img src='{_logo_src}' alt='logo'/></div>", unsafe_allow_html=True)
     # Render entire login stack inside the middle column for perfect centering
     c1, c2, c3 = st.columns([1,2,1])
@@ -1265,6 +1328,9 @@ if not st.session_state.get("user"):
 
     st.stop()
 
+# Keep the Google access token ahead of expiry without blocking the rerun
+_get_google_access_token()
+
 # Inject logo into the Streamlit sidebar logo spacer (native location)
 if _nav_logo_rel:
     st.markdown(
@@ -1297,6 +1363,19 @@ if _nav_logo_rel:
         unsafe_allow_html=True,
     )
 
+def _save_upload(upload, path: str, block_size: int = 1 << 20) -> str:
+    """Stream an uploaded file to ``path`` in fixed-size blocks and return its content digest.
+
+    Keeps peak memory at one block instead of a full ``read()`` copy of the PDF.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    upload.seek(0)
+    with open(path, "wb") as f:
+        for block in iter(lambda: upload.read(block_size), b""):
+            h.update(block)
+            f.write(block)
+    return h.hexdigest()
+
 def _render_create_form(prefix: str = "dialog"):
     # Only admins (by email list) can create — no password fallback here
     if not is_admin_user():
@@ -1314,22 +1393,111 @@ def _render_create_form(prefix: str = "dialog"):
             st.warning("Please upload a product PDF.")
         else:
             product = store.get_by_name(name)
-            if product is None:
-                product_id = str(uuid.uuid4())
-            else:
-                product_id = product["id"]
-            pdf_path = os.path.join(PDF_DIR, f"{product_id}.pdf")
-            with open(pdf_path, "wb") as f:
-                f.write(pdf_file.read())
+            user_email = ((st.session_state.get("user") or {}).get("email") or "").strip().lower()
+            _submit_ingest(name, desc, pdf_file, user_email, product_id=(product or {}).get("id"))
+    if st.session_state.get("ingest_futures"):
+        _render_ingest_status()
+
+def _index_pdf(pid: str, pdf_path: str, digest: str, done_message: str) -> Dict:
+    """Extract, chunk and index a saved PDF; the indexing half of _ingest.
+
+    Returns {"id", "notices"}; _ingest prefixes its upload notices onto these.
+    """
+    notices = []
+    try:
+        chunks = extract_and_chunk_cached(digest, pdf_path)
+    except Exception as e:
+        notices.append(("❌", f"Failed to process PDF: {e}"))
+        chunks = []
+    retriever.index_product(pid, chunks)
+    notices.append(("✅", done_message))
+    return {"id": pid, "notices": notices}
+
+def _ingest(pid: str, pdf_path: str, digest: str, name_c: str, desc_c: str, upload_url: str, user_email: str, fname: str, http) -> Dict:
+    """Upload and index a saved Knowledgebase PDF on the worker pool.
+
+    Streamlit commands cannot run off the script thread, so outcomes are
+    returned as (icon, message) notices for the caller to surface.
+    """
+    notices = []
+    if upload_url:
+        try:
+            with open(pdf_path, "rb") as fh:
+                _resp = http.post(
+                    upload_url,
+                    data={
+                        "id": pid,
+                        "name": name_c,
+                        "operation": "create",
+                        "description": (desc_c or ""),
+                        "pdf_path": pdf_path,
+                        "created_by": user_email,
+                        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        "updated_by": "",
+                        "updated_at": "",
+                    },
+                    files={"file": (fname, fh, "application/pdf")},
+                    timeout=60,
+                )
             try:
-                text = extract_text_from_pdf(pdf_path)
-                chunks = chunk_text(text)
-            except Exception as e:
-                st.error(f"Failed to process PDF: {e}")
-                chunks = []
-            # Removed: store.upsert() - using database only
-            retriever.index_product(product_id, chunks)
-            st.success("Knowledgebase saved and indexed successfully.")
+                _j = _resp.json()
+                if bool(_j.get("success")):
+                    notices.append(("✅", str(_j.get("message") or "File uploaded successfully")))
+                else:
+                    notices.append(("⚠️", str(_j.get("message") or "Upload webhook did not confirm success")))
+            except Exception:
+                notices.append(("⚠️", "Upload webhook responded without JSON"))
+        except Exception:
+            notices.append(("⚠️", "Failed to call upload webhook"))
+    # Removed: store.upsert() - using database only
+    result = _index_pdf(pid, pdf_path, digest, f"Knowledgebase '{name_c}' created and indexed successfully.")
+    result["notices"] = notices + result["notices"]
+    return result
+
+def _submit_ingest(name: str, desc: str, upload, user_email: str, product_id: Optional[str] = None) -> str:
+    """Save an uploaded PDF and queue its upload webhook + indexing on the worker pool.
+
+    Shared by every create entry point; progress is surfaced by _render_ingest_status.
+    """
+    pid = product_id or str(uuid.uuid4())
+    pdf_path = os.path.join(PDF_DIR, f"{pid}.pdf")
+    digest = _save_upload(upload, pdf_path)
+    fut = _executor().submit(
+        _ingest,
+        pid,
+        pdf_path,
+        digest,
+        name,
+        desc,
+        _get_upload_url(),
+        user_email,
+        getattr(upload, "name", "uploaded.pdf"),
+        _http(),
+    )
+    st.session_state.setdefault("ingest_futures", {})[pid] = fut
+    st.toast(f"Indexing '{name}' in the background...", icon="⏳")
+    return pid
+
+@st.fragment(run_every=1)
+def _render_ingest_status():
+    """Poll background ingestion jobs and surface their results when done."""
+    futures = st.session_state.get("ingest_futures") or {}
+    done = [pid for pid, fut in futures.items() if fut.done()]
+    for pid in done:
+        fut = futures.pop(pid)
+        try:
+            result = fut.result()
+        except Exception as e:
+            st.toast(f"Failed to create Knowledgebase: {e}", icon="❌")
+            continue
+        for icon, message in result.get("notices", []):
+            st.toast(message, icon=icon)
+    if futures:
+        st.caption(f"⏳ Indexing {len(futures)} Knowledgebase(s) in the background...")
+    elif done:
+        # Refresh the whole page so the table picks up the new rows
+        _bump_store_version()
+        st.rerun()
 
 # Create Knowledgebase dialog (admin protected) with fallback
 if st.session_state.get("show_create_dialog"):
@@ -1353,6 +1521,12 @@ page = st.session_state.get("nav_page", "Dashbord")
 if page == "aarya":
     page = "Aarya"
 
+@st.cache_resource(show_spinner=False)
+def _get_option_menu():
+    """Import the option_menu component on first use (only signed-in views render the sidebar)."""
+    from streamlit_option_menu import option_menu
+    return option_menu
+
 # Minimal sidebar navigation (clean, no captions)
 with st.sidebar:
     _options = ["Dashbord", "Aarya"]
@@ -1362,7 +1536,7 @@ with st.sidebar:
         _icons.append("folder-plus")
     _default_index = _options.index(page) if page in _options else 0
     try:
-        side_selected = option_menu(
+        side_selected = _get_option_menu()(
             menu_title=None,
             options=_options,
             icons=_icons,
@@ -1390,12 +1564,11 @@ with st.sidebar:
                         del st.session_state[k]
                 except Exception:
                     pass
+            # Only the product list is refreshed; shared resources and other
+            # sessions' caches (rendered messages, chip markup) stay warm
             try:
-                st.cache_data.clear()
-            except Exception:
-                pass
-            try:
-                st.cache_resource.clear()
+                _list_products.clear()
+                _name_to_id.clear()
             except Exception:
                 pass
             st.session_state["nav_page"] = side_selected
@@ -1407,43 +1580,36 @@ with st.sidebar:
 if 'page' not in locals() or not page:
     page = st.session_state.get("nav_page", "Aarya")
 
+# Toolbar user chip styles (static, emitted together with the chip markup)
+_CHIP_CSS = """<style>
+  .tb-chip { position: fixed; top: 8px; right: 16px; z-index: 2147483647; display:flex; align-items:center; gap:10px; }
+  .tb-chip .chip { display:flex; align-items:center; gap:8px; background:#fff; border:1px solid #e5e7eb; border-radius:9999px; padding:4px 10px; box-shadow: 0 1px 2px rgba(0,0,0,0.06); }
+  .tb-chip .avatar { width:24px; height:24px; border-radius:50%; display:flex; align-items:center; justify-content:center; font-size:13px; background:#e5e7eb; color:#374151; overflow:hidden; }
+  .tb-chip .avatar img { width:100%; height:100%; object-fit: cover; display:block; }
+  .tb-chip .name span { font-size:13px; color:#111827; text-decoration:none; max-width: 180px; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; display:block; }
+  /* Profile dropdown */
+  .tb-profile { position: fixed; top: 44px; right: 16px; z-index: 2147483651; background:#fff; border:1px solid #e5e7eb; border-radius:12px; box-shadow:0 8px 24px rgba(0,0,0,0.12); min-width: 260px; max-width: 320px; overflow:hidden; }
+  .tb-profile .row { display:flex; align-items:center; gap:12px; padding: 12px 14px; }
+  .tb-profile .row + .row { border-top: 1px solid #f1f5f9; }
+  .tb-profile .avatar-xl { width:40px; height:40px; border-radius:50%; background:#e5e7eb; color:#374151; display:flex; align-items:center; justify-content:center; font-size:16px; overflow:hidden; }
+  .tb-profile .avatar-xl img { width:100%; height:100%; object-fit: cover; display:block; }
+  .tb-profile .name { font-weight:600; color:#111827; }
+  .tb-profile .email { font-size:12px; color:#6b7280; }
+  .tb-profile .logout-btn { margin-left:auto; color:#ef4444; text-decoration:none; font-size:13px; }
+  .tb-profile .logout-btn:hover { text-decoration: underline; }
+  .tb-profile, .tb-profile * { pointer-events: auto !important; }
+  /* No extra visible logout button; handled via JS click on the text */
+</style>
+"""
+
 # Toolbar user chip (Google style) on the right
-if st.session_state.get("user"):
-    u = st.session_state.get("user", {})
-    name_html = (u.get("name") or u.get("email") or "User").replace("<", "&lt;").replace(">", "&gt;")
-    initial = (u.get("name") or u.get("email") or "?")[:1]
-    pic = u.get("picture") or ""
-    prof_on = bool(st.session_state.get("show_profile"))
-    st.markdown(
-        """
-        <style>
-          .tb-chip { position: fixed; top: 8px; right: 16px; z-index: 2147483647; display:flex; align-items:center; gap:10px; }
-          .tb-chip .chip { display:flex; align-items:center; gap:8px; background:#fff; border:1px solid #e5e7eb; border-radius:9999px; padding:4px 10px; box-shadow: 0 1px 2px rgba(0,0,0,0.06); }
-          .tb-chip .avatar { width:24px; height:24px; border-radius:50%; display:flex; align-items:center; justify-content:center; font-size:13px; background:#e5e7eb; color:#374151; overflow:hidden; }
-          .tb-chip .avatar img { width:100%; height:100%; object-fit: cover; display:block; }
-          .tb-chip .name span { font-size:13px; color:#111827; text-decoration:none; max-width: 180px; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; display:block; }
-          /* Profile dropdown */
-          .tb-profile { position: fixed; top: 44px; right: 16px; z-index: 2147483651; background:#fff; border:1px solid #e5e7eb; border-radius:12px; box-shadow:0 8px 24px rgba(0,0,0,0.12); min-width: 260px; max-width: 320px; overflow:hidden; }
-          .tb-profile .row { display:flex; align-items:center; gap:12px; padding: 12px 14px; }
-          .tb-profile .row + .row { border-top: 1px solid #f1f5f9; }
-          .tb-profile .avatar-xl { width:40px; height:40px; border-radius:50%; background:#e5e7eb; color:#374151; display:flex; align-items:center; justify-content:center; font-size:16px; overflow:hidden; }
-          .tb-profile .avatar-xl img { width:100%; height:100%; object-fit: cover; display:block; }
-          .tb-profile .name { font-weight:600; color:#111827; }
-          .tb-profile .email { font-size:12px; color:#6b7280; }
-          .tb-profile .logout-btn { margin-left:auto; color:#ef4444; text-decoration:none; font-size:13px; }
-          .tb-profile .logout-btn:hover { text-decoration: underline; }
-          .tb-profile, .tb-profile * { pointer-events: auto !important; }
-          /* Transparent button overlay positioned over the chip to catch clicks */
-          div.st-key-chip_toggle_btn { position: fixed; top: 8px; right: 16px; width: 200px; height: 36px; z-index: 2147483650; }
-          div.st-key-chip_toggle_btn button { width: 100%; height: 100%; background: transparent !important; border: 0 !important; color: transparent !important; box-shadow: none !important; }
-          /* Close button overlay when dropdown is open */
-          div.st-key-chip_close_btn { position: fixed; top: 8px; right: 16px; width: 200px; height: 36px; z-index: 2147483650; }
-          div.st-key-chip_close_btn button { width: 100%; height: 100%; background: transparent !important; border: 0 !important; color: transparent !important; box-shadow: none !important; }
-          /* No extra visible logout button; handled via JS click on the text */
-        </style>
-        """,
-        unsafe_allow_html=True,
-    )
+@st.cache_data(show_spinner=False, max_entries=256)
+def _chip_markup(name: str, email: str, picture: str) -> str:
+    """Build the chip styles and profile dropdown markup for one user."""
+    name_html = html.escape(name or email or "User", quote=True)
+    email_html = html.escape(email or "", quote=True)
+    initial = html.escape((name or email or "?")[:1], quote=True)
+    pic = html.escape(picture or "", quote=True)
 
     avatar_small_html = f"<img src='{pic}' alt='avatar'/>" if pic else initial
     avatar_large_html = f"<img src='{pic}' alt='avatar'/>" if pic else initial
@@ -1453,7 +1619,7 @@ if st.session_state.get("user"):
         "<details class='tb-profile-menu' id='tb-profile-menu'>"
         "  <summary>"
         "    <div class='chip' aria-haspopup='menu' aria-expanded='false'>"
-        f"      <div class='avatar' title='{u.get('email','')}'>{avatar_small_html}</div>"
+        f"      <div class='avatar' title='{email_html}'>{avatar_small_html}</div>"
         f"      <div class='name'><span>{name_html}</span></div>"
         "    </div>"
         "  </summary>"
@@ -1462,7 +1628,7 @@ if st.session_state.get("user"):
         f"      <div class='avatar-xl'>{avatar_large_html}</div>"
         "      <div style='min-width:0'>"
         f"        <div class='name'>{name_html}</div>"
-        f"        <div class='email'>{u.get('email','')}</div>"
+        f"        <div class='email'>{email_html}</div>"
         "      </div>"
         "      <a class='logout-btn' href='./?logout=1' target='_self' role='menuitem'>Logout</a>"
         "    </div>"
@@ -1490,10 +1656,153 @@ if st.session_state.get("user"):
         "</script>"
     )
 
-    # Render native menu
-    st.markdown(menu_html, unsafe_allow_html=True)
+    return _CHIP_CSS + menu_html
+
+if st.session_state.get("user"):
+    u = st.session_state.get("user", {})
+    # Render styles and native menu as a single element
+    st.markdown(
+        _chip_markup(u.get("name") or "", u.get("email") or "", u.get("picture") or ""),
+        unsafe_allow_html=True,
+    )
     # No extra visible logout controls; link navigates with ?logout=1 which triggers server _logout()
 
+# Knowledgebase table styles (header and borderless action buttons), emitted with the table header
+_KB_TABLE_CSS = """<style>
+  .kb-header { margin-bottom: 8px !important; padding-bottom: 0 !important; }
+  /* Remove borders from column containers */
+  [data-testid="stHorizontalBlock"] { 
+    gap: 0 !important; 
+    padding: 0 !important; 
+    margin: 0 !important; 
+    border: none !important;
+    box-shadow: none !important;
+  }
+  [data-testid="column"] { 
+    padding: 0 !important; 
+    margin: 0 !important; 
+    border: none !important;
+    box-shadow: none !important;
+  }
+  .element-container { 
+    padding: 0 !important; 
+    margin: 0 !important; 
+    border: none !important;
+  }
+  /* Target Streamlit layout wrapper divs to remove default spacing */
+  .kb-action-btn [data-testid="stHorizontalBlock"] { gap: 0 !important; padding: 0 !important; margin: 0 !important; border: none !important; }
+  .kb-action-btn [data-testid="column"] { padding: 0 !important; margin: 0 !important; border: none !important; }
+  .kb-action-btn .element-container { padding: 0 !important; margin: 0 !important; border: none !important; }
+  .kb-action-btn [class*="stLayoutWrapper"] { padding: 0 !important; margin: 0 !important; border: none !important; }
+  /* Remove all spacing from action button containers */
+  .kb-action-btn { margin: 0 !important; padding: 0 !important; border: none !important; }
+  .kb-action-btn .stButton { margin: 0 !important; padding: 0 !important; border: none !important; }
+  .kb-action-btn .stButton>button {
+    background: transparent !important;
+    background-color: transparent !important;
+    border: none !important;
+    border-width: 0 !important;
+    box-shadow: none !important;
+    padding: 0 !important;
+    margin: 0 !important;
+    min-height: auto !important;
+    border-radius: 0 !important;
+    color: #475569 !important;
+    font-size: 18px !important;
+    line-height: 1 !important;
+  }
+  .kb-action-btn .stButton>button:hover { 
+    background: transparent !important; 
+    background-color: transparent !important;
+    opacity: 0.7 !important; 
+    border: none !important;
+    border-width: 0 !important;
+  }
+  .kb-action-btn .stButton>button:active { 
+    background: transparent !important; 
+    background-color: transparent !important;
+    border: none !important;
+    border-width: 0 !important;
+  }
+  .kb-action-btn .stButton>button:focus { 
+    background: transparent !important; 
+    background-color: transparent !important;
+    outline: none !important; 
+    box-shadow: none !important; 
+    border: none !important;
+    border-width: 0 !important;
+  }
+  .kb-action-btn .stButton>button:disabled { opacity: 0.3; cursor: not-allowed; }
+  /* Target buttons by key for extra specificity */
+  div.st-key-kb_inline_delete_sel,
+  div.st-key-kb_inline_edit_sel {
+    border: none !important;
+    box-shadow: none !important;
+  }
+  div.st-key-kb_inline_delete_sel button,
+  div.st-key-kb_inline_edit_sel button {
+    background: transparent !important;
+    background-color: transparent !important;
+    border: none !important;
+    border-width: 0 !important;
+    box-shadow: none !important;
+  }
+  div.st-key-kb_inline_delete_sel button:hover,
+  div.st-key-kb_inline_edit_sel button:hover,
+  div.st-key-kb_inline_delete_sel button:active,
+  div.st-key-kb_inline_edit_sel button:active,
+  div.st-key-kb_inline_delete_sel button:focus,
+  div.st-key-kb_inline_edit_sel button:focus {
+    background: transparent !important;
+    background-color: transparent !important;
+    border: none !important;
+    border-width: 0 !important;
+    box-shadow: none !important;
+    outline: none !important;
+  }
+</style>
+"""
+
+# Chat messages rendered per page; "Show earlier" extends the window by this much
+CHAT_RENDER_WINDOW = 50
+
+
+def _persist_reaction(chat_store: ChatHistoryStore, user: str, product_id: str, msg: Msg) -> None:
+    """Append the message's current like/dislike so a reload keeps the buttons disabled."""
+    if not msg.msg_id:
+        return  # index-based fallback ids are not stable across reloads
+    try:
+        chat_store.append_reaction(user, product_id, msg.msg_id, msg.like, msg.dislike)
+    except Exception:
+        pass
+
+
+def _render_msg(role: str, content: str, ts: str) -> str:
+    """HTML for one chat message.
+
+    Assistant output is header + markdown bubble only; its timestamp sits in the reaction row.
+    """
+    if role == "assistant":
+        # Blank lines let the markdown render inside the wrapper
+        return (
+            "<div class='msg-header right'><span class='name'>AARYA</span><span class='avatar avatar-assistant'>A</span></div>"
+            f"""<div class="assistant-msg-wrapper">
+
+{content}
+
+</div>"""
+        )
+    # Escape HTML/XML characters for user messages
+    text_escaped = html.escape(content).replace('\n', '<br>')
+    return (
+        "<div class='user-msg-row'><div>"
+        "<div class='msg-header'><span class='avatar avatar-user'>Y</span><span class='name'>You</span></div>"
+        f"<div class='bubble-user'>{text_escaped}</div>"
+        f"<div class='meta-row'>{html.escape(ts)}</div>"
+        "</div></div>"
+    )
+
+
 # ---------------------- Knowledgebase Page ----------------------
 if page == "Knowledgebase":
     # Update toolbar title for this page
@@ -1506,12 +1815,17 @@ if page == "Knowledgebase":
         unsafe_allow_html=True,
     )
 
+    user_email = ((st.session_state.get("user") or {}).get("email") or "").strip().lower()
+
     if not is_admin_user():
         st.info("This page is restricted to admins.")
     else:
+        # Surface progress of any background ingestion started from this session
+        if st.session_state.get("ingest_futures"):
+            _render_ingest_status()
         # Manage knowledge base (Edit/Delete only)
-        repo = get_pdf_metadata_repo()
-        products = _enrich_rows_with_status_label(repo.list_all())
+        products = _list_products(_store_version())
+        products_by_id = {p.get("id"): p for p in products}
         # Create/Edit appears before the table; driven by previously selected rows (from session_state)
         sel_rows_state = st.session_state.get("kb_selected_rows", [])
         is_edit_state = len(sel_rows_state) == 1
@@ -1519,7 +1833,7 @@ if page == "Knowledgebase":
         with st.container():
             if is_edit_state:
                 _pid = sel_rows_state[0].get("id")
-                _cur = next((p for p in products if p.get("id") == _pid), None) or {}
+                _cur = products_by_id.get(_pid) or {}
                 
                 # Card-style container with professional styling
                 st.markdown("""
@@ -1560,6 +1874,15 @@ if page == "Knowledgebase":
                             padding: 8px 12px;
                             margin: 8px 0;
                         }
+                        .kb-files-label {
+                            font-size: 14px;
+                            font-weight: 400;
+                            color: rgb(49, 51, 63);
+                            margin-bottom: 0.25rem;
+                            display: block;
+                        }
+                        .kb-file-cell { padding-top: 8px; font-size: 14px; color: #333; }
+                        .kb-file-size { padding-top: 8px; font-size: 12px; color: #999; }
                     </style>
                 """, unsafe_allow_html=True)
                 
@@ -1574,7 +1897,7 @@ if page == "Knowledgebase":
                 pdf_path = _cur.get("pdf_path", "")
                 
                 if pdf_path and os.path.exists(pdf_path):
-                    st.markdown("<label style='font-size: 14px; font-weight: 400; color: rgb(49, 51, 63); margin-bottom: 0.25rem; display: block;'>Current Files</label>", unsafe_allow_html=True)
+                    st.markdown("<label class='kb-files-label'>Current Files</label>", unsafe_allow_html=True)
                     
                     # Get file size
                     try:
@@ -1618,13 +1941,13 @@ if page == "Knowledgebase":
                         col_icon, col_name, col_size, col_delete, col_view = st.columns([0.3, 3, 0.8, 0.5, 0.5])
                         
                         with col_icon:
-                            st.markdown("<div style='padding-top: 8px;'>📄</div>", unsafe_allow_html=True)
+                            st.markdown("<div class='kb-file-cell'>📄</div>", unsafe_allow_html=True)
                         
                         with col_name:
-                            st.markdown(f"<div style='padding-top: 8px; font-size: 14px; color: #333;'>{cur_fname}</div>", unsafe_allow_html=True)
+                            st.markdown(f"<div class='kb-file-cell'>{cur_fname}</div>", unsafe_allow_html=True)
                         
                         with col_size:
-                            st.markdown(f"<div style='padding-top: 8px; font-size: 12px; color: #999;'>{file_size_mb:.2f} MB</div>", unsafe_allow_html=True)
+                            st.markdown(f"<div class='kb-file-size'>{file_size_mb:.2f} MB</div>", unsafe_allow_html=True)
                         
                         with col_delete:
                             st.markdown('<div class="kb-current-file-btn">', unsafe_allow_html=True)
@@ -1633,6 +1956,7 @@ if page == "Knowledgebase":
                                 try:
                                     repo = get_pdf_metadata_repo()
                                     repo.update(_pid, {"pdf_path": ""})
+                                    _bump_store_version()
                                     st.success("PDF file reference removed successfully.")
                                     st.rerun()
                                 except Exception as e:
@@ -1691,7 +2015,6 @@ if page == "Knowledgebase":
                             desc_val != _cur.get("description") or
                             new_pdfs
                         ):
-                            user_email = ((st.session_state.get("user") or {}).get("email") or "").strip().lower()
                             # If new PDFs were uploaded, process them
                             pdf_path = _cur.get("pdf_path", "")
                             if new_pdfs and pdf_path:
@@ -1699,21 +2022,8 @@ if page == "Knowledgebase":
                                     # Process the first PDF file (or merge multiple if needed)
                                     # For now, we'll use the first file
                                     first_pdf = new_pdfs[0]
-                                    _bytes = first_pdf.read()
-                                    with open(pdf_path, "wb") as f:
-                                        f.write(_bytes)
-                                    try:
-                                        upload_url = (str(
-                                            (CONFIG_TOML.get("custom", {}) or {}).get("UPLOAD_WEBHOOK_URL")
-                                            or CONFIG_TOML.get("UPLOAD_WEBHOOK_URL")
-                                            or ((st.secrets.get("configurl") if hasattr(st, "secrets") else None))
-                                            or st.secrets.get("upload_url")
-                                            or os.environ.get("CONFIG_URL")
-                                            or os.environ.get("UPLOAD_WEBHOOK_URL")
-                                            or ""
-                                        )).strip()
-                                    except Exception:
-                                        upload_url = ""
+                                    digest = _save_upload(first_pdf, pdf_path)
+                                    upload_url = _get_upload_url()
                                     if not upload_url:
                                         st.warning("Upload webhook URL not configured; delete webhook not sent.")
                                     if upload_url:
@@ -1722,8 +2032,7 @@ if page == "Knowledgebase":
                                         except Exception:
                                             st.warning("Failed to call upload webhook")
                                     try:
-                                        text = extract_text_from_pdf(pdf_path)
-                                        chunks = chunk_text(text)
+                                        chunks = extract_and_chunk_cached(digest, pdf_path)
                                     except Exception:
                                         chunks = []
                                     try:
@@ -1735,18 +2044,7 @@ if page == "Knowledgebase":
                                 except Exception:
                                     pass
                             # Always notify webhook for edit (with or without a new file)
-                            try:
-                                upload_url = (str(
-                                    (CONFIG_TOML.get("custom", {}) or {}).get("UPLOAD_WEBHOOK_URL")
-                                    or CONFIG_TOML.get("UPLOAD_WEBHOOK_URL")
-                                    or ((st.secrets.get("configurl") if hasattr(st, "secrets") else None))
-                                    or st.secrets.get("upload_url")
-                                    or os.environ.get("CONFIG_URL")
-                                    or os.environ.get("UPLOAD_WEBHOOK_URL")
-                                    or ""
-                                )).strip()
-                            except Exception:
-                                upload_url = ""
+                            upload_url = _get_upload_url()
                             if upload_url:
                                 try:
                                     try:
@@ -1758,12 +2056,11 @@ if page == "Knowledgebase":
                                             fname = os.path.basename(pdf_path) or "uploaded.pdf"
                                         except Exception:
                                             fname = "uploaded.pdf"
-                                    file_bytes = None
+                                    file_handle = None
                                     try:
-                                        with open(pdf_path, "rb") as _f:
-                                            file_bytes = _f.read()
+                                        file_handle = open(pdf_path, "rb")
                                     except Exception:
-                                        file_bytes = None
+                                        file_handle = None
                                     _data = {
                                         "id": _pid,
                                         "name": name_val,
@@ -1773,21 +2070,25 @@ if page == "Knowledgebase":
                                         "created_by": _cur.get("created_by", ""),
                                         "created_at": _cur.get("created_at", ""),
                                         "updated_by": user_email,
-                                        "updated_at": datetime.now().isoformat(timespec="seconds"),
+                                        "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
                                     }
-                                    if file_bytes is not None:
-                                        _resp = requests.post(
-                                            upload_url,
-                                            data=_data,
-                                            files={"file": (fname, file_bytes, "application/pdf")},
-                                            timeout=20,
-                                        )
-                                    else:
-                                        _resp = requests.post(
-                                            upload_url,
-                                            data=_data,
-                                            timeout=20,
-                                        )
+                                    try:
+                                        if file_handle is not None:
+                                            _resp = _http().post(
+                                                upload_url,
+                                                data=_data,
+                                                files={"file": (fname, file_handle, "application/pdf")},
+                                                timeout=20,
+                                            )
+                                        else:
+                                            _resp = _http().post(
+                                                upload_url,
+                                                data=_data,
+                                                timeout=20,
+                                            )
+                                    finally:
+                                        if file_handle is not None:
+                                            file_handle.close()
                                     try:
                                         _j = _resp.json()
                                         if bool(_j.get("success")):
@@ -1800,6 +2101,7 @@ if page == "Knowledgebase":
                                     st.toast("Failed to call upload webhook", icon="⚠️")
                             # Removed: store.upsert() - using database only
                             st.toast("Saved changes.", icon="✅")
+                            _bump_store_version()
                             st.rerun()
                         else:
                             st.toast("No changes detected.", icon="ℹ️")
@@ -1829,95 +2131,43 @@ if page == "Knowledgebase":
                         elif not pdf_c:
                             st.toast("Please upload a product PDF.", icon="⚠️")
                         else:
-                            pid = str(uuid.uuid4())
-                            pdf_path = os.path.join(PDF_DIR, f"{pid}.pdf")
-                            _bytes = pdf_c.read()
-                            with open(pdf_path, "wb") as f:
-                                f.write(_bytes)
-                            try:
-                                upload_url = (str(
-                                    (CONFIG_TOML.get("custom", {}) or {}).get("UPLOAD_WEBHOOK_URL")
-                                    or CONFIG_TOML.get("UPLOAD_WEBHOOK_URL")
-                                    or ((st.secrets.get("configurl") if hasattr(st, "secrets") else None))
-                                    or st.secrets.get("upload_url")
-                                    or os.environ.get("CONFIG_URL")
-                                    or os.environ.get("UPLOAD_WEBHOOK_URL")
-                                    or ""
-                                )).strip()
-                            except Exception:
-                                upload_url = ""
-                            if upload_url:
-                                try:
-                                    _fname = getattr(pdf_c, "name", "uploaded.pdf")
-                                    user_email = ((st.session_state.get("user") or {}).get("email") or "").strip().lower()
-                                    _resp = requests.post(
-                                        upload_url,
-                                        data={
-                                            "id": pid,
-                                            "name": name_c,
-                                            "operation": "create",
-                                            "description": (desc_c or ""),
-                                            "pdf_path": pdf_path,
-                                            "created_by": user_email,
-                                            "created_at": datetime.now().isoformat(timespec="seconds"),
-                                            "updated_by": "",
-                                            "updated_at": "",
-                                        },
-                                        files={"file": (_fname, _bytes, "application/pdf")},
-                                        timeout=20,
-                                    )
-                                    try:
-                                        _j = _resp.json()
-                                        if bool(_j.get("success")):
-                                            st.toast(str(_j.get("message") or "File uploaded successfully"), icon="✅")
-                                        else:
-                                            st.toast(str(_j.get("message") or "Upload webhook did not confirm success"), icon="⚠️")
-                                    except Exception:
-                                        st.toast("Upload webhook responded without JSON", icon="⚠️")
-                                except Exception:
-                                    st.toast("Failed to call upload webhook", icon="⚠️")
-                            try:
-                                text = extract_text_from_pdf(pdf_path)
-                                chunks = chunk_text(text)
-                            except Exception as e:
-                                st.toast(f"Failed to process PDF: {e}", icon="❌")
-                                chunks = []
-                            user_email = ((st.session_state.get("user") or {}).get("email") or "").strip().lower()
-                            emails_list: List[str] = [user_email] if user_email else []
-                            # Removed: store.upsert() - using database only
-                            retriever.index_product(pid, chunks)
-                            st.toast("Knowledgebase created and indexed successfully.", icon="✅")
+                            _submit_ingest(name_c, desc_c, pdf_c, user_email)
                             st.rerun()
 
         # Inline editing table using Streamlit Data Editor
         if products:
             st.markdown("<hr style='margin: 24px 0 16px 0; border: none; border-top: 1px solid #e5e7eb;'>", unsafe_allow_html=True)
             st.markdown(
-                """
-                <style>
-                  .kb-header { margin-bottom: 8px !important; padding-bottom: 0 !important; }
-                </style>
-                <div class="kb-header"><strong>Existing knowledges</strong></div>
-                """,
+                _KB_TABLE_CSS + '<div class="kb-header"><strong>Existing knowledges</strong></div>',
                 unsafe_allow_html=True
             )
-            rows = []
-            for p in products:
-                rows.append({
-                    "Knowledgebase name": p.get("name", ""),
-                    "Description": p.get("description", ""),
-                    "Created by": p.get("created_by", ""),
-                    "Created at": p.get("created_at", ""),
-                    "Updated by": p.get("updated_by", ""),
-                    "Updated at": p.get("updated_at", ""),
-                    "Select": False,
-                    "_id": p.get("id")
-                })
-            df = pd.DataFrame(rows)
             # Include hidden _id column to keep a stable row identity even if user sorts in the editor
             # Place 'Select' as the first column as requested
             # ID column is kept in dataframe but hidden from display
             display_cols = ["Select", "Knowledgebase name", "Description", "Created by", "Created at", "Updated by", "Updated at", "_id"]
+            # Rebuild the table frame only when the listed rows change
+            df_sig = hash(tuple(
+                (p.get("id"), p.get("name"), p.get("description"), p.get("updated_at"))
+                for p in products
+            ))
+            if st.session_state.get("kb_df_sig") == df_sig and "kb_df" in st.session_state:
+                df = st.session_state["kb_df"]
+            else:
+                rows = []
+                for p in products:
+                    rows.append({
+                        "Knowledgebase name": p.get("name", ""),
+                        "Description": p.get("description", ""),
+                        "Created by": p.get("created_by", ""),
+                        "Created at": p.get("created_at", ""),
+                        "Updated by": p.get("updated_by", ""),
+                        "Updated at": p.get("updated_at", ""),
+                        "Select": False,
+                        "_id": p.get("id")
+                    })
+                df = pd.DataFrame.from_records(rows, columns=display_cols)
+                st.session_state["kb_df"] = df
+                st.session_state["kb_df_sig"] = df_sig
             if df.empty:
                 st.info("No Knowledgebases available.")
             else:
@@ -1929,8 +2179,9 @@ if page == "Knowledgebase":
                     hide_index=True,
                     width='stretch',
                     column_config={
-                        "Knowledgebase name": st.column_config.TextColumn(disabled=False),
-                        "Description": st.column_config.TextColumn(disabled=False),
+                        # Name/description are changed through the Edit panel, which calls the webhook
+                        "Knowledgebase name": st.column_config.TextColumn(disabled=True),
+                        "Description": st.column_config.TextColumn(disabled=True),
                         "Created by": st.column_config.TextColumn(disabled=True),
                         "Created at": st.column_config.TextColumn(disabled=True),
                         "Updated by": st.column_config.TextColumn(disabled=True),
@@ -1939,207 +2190,78 @@ if page == "Knowledgebase":
                         "_id": None,  # Hide ID column by default
                     },
                 )
+                selected_ids = edited["_id"][edited["Select"].fillna(False).to_numpy(dtype=bool)].tolist()
                 # Render the action bar INTO the container we placed before the table
                 with ab_container:
-                    st.markdown(
-                        """
-                        <style>
-                          /* Remove borders from column containers */
-                          [data-testid="stHorizontalBlock"] { 
-                            gap: 0 !important; 
-                            padding: 0 !important; 
-                            margin: 0 !important; 
-                            border: none !important;
-                            box-shadow: none !important;
-                          }
-                          [data-testid="column"] { 
-                            padding: 0 !important; 
-                            margin: 0 !important; 
-                            border: none !important;
-                            box-shadow: none !important;
-                          }
-                          .element-container { 
-                            padding: 0 !important; 
-                            margin: 0 !important; 
-                            border: none !important;
-                          }
-                          /* Target Streamlit layout wrapper divs to remove default spacing */
-                          .kb-action-btn [data-testid="stHorizontalBlock"] { gap: 0 !important; padding: 0 !important; margin: 0 !important; border: none !important; }
-                          .kb-action-btn [data-testid="column"] { padding: 0 !important; margin: 0 !important; border: none !important; }
-                          .kb-action-btn .element-container { padding: 0 !important; margin: 0 !important; border: none !important; }
-                          .kb-action-btn [class*="stLayoutWrapper"] { padding: 0 !important; margin: 0 !important; border: none !important; }
-                          /* Remove all spacing from action button containers */
-                          .kb-action-btn { margin: 0 !important; padding: 0 !important; border: none !important; }
-                          .kb-action-btn .stButton { margin: 0 !important; padding: 0 !important; border: none !important; }
-                          .kb-action-btn .stButton>button {
-                            background: transparent !important;
-                            background-color: transparent !important;
-                            border: none !important;
-                            border-width: 0 !important;
-                            box-shadow: none !important;
-                            padding: 0 !important;
-                            margin: 0 !important;
-                            min-height: auto !important;
-                            border-radius: 0 !important;
-                            color: #475569 !important;
-                            font-size: 18px !important;
-                            line-height: 1 !important;
-                          }
-                          .kb-action-btn .stButton>button:hover { 
-                            background: transparent !important; 
-                            background-color: transparent !important;
-                            opacity: 0.7 !important; 
-                            border: none !important;
-                            border-width: 0 !important;
-                          }
-                          .kb-action-btn .stButton>button:active { 
-                            background: transparent !important; 
-                            background-color: transparent !important;
-                            border: none !important;
-                            border-width: 0 !important;
-                          }
-                          .kb-action-btn .stButton>button:focus { 
-                            background: transparent !important; 
-                            background-color: transparent !important;
-                            outline: none !important; 
-                            box-shadow: none !important; 
-                            border: none !important;
-                            border-width: 0 !important;
-                          }
-                          .kb-action-btn .stButton>button:disabled { opacity: 0.3; cursor: not-allowed; }
-                          /* Target buttons by key for extra specificity */
-                          div.st-key-kb_inline_delete_sel,
-                          div.st-key-kb_inline_edit_sel {
-                            border: none !important;
-                            box-shadow: none !important;
-                          }
-                          div.st-key-kb_inline_delete_sel button,
-                          div.st-key-kb_inline_edit_sel button {
-                            background: transparent !important;
-                            background-color: transparent !important;
-                            border: none !important;
-                            border-width: 0 !important;
-                            box-shadow: none !important;
-                          }
-                          div.st-key-kb_inline_delete_sel button:hover,
-                          div.st-key-kb_inline_edit_sel button:hover,
-                          div.st-key-kb_inline_delete_sel button:active,
-                          div.st-key-kb_inline_edit_sel button:active,
-                          div.st-key-kb_inline_delete_sel button:focus,
-                          div.st-key-kb_inline_edit_sel button:focus {
-                            background: transparent !important;
-                            background-color: transparent !important;
-                            border: none !important;
-                            border-width: 0 !important;
-                            box-shadow: none !important;
-                            outline: none !important;
-                          }
-                        </style>
-                        """,
-                        unsafe_allow_html=True,
-                    )
                     # Use columns to force right alignment
                     spacer, btn_del, btn_edit = st.columns([0.92, 0.04, 0.04])
                     with btn_del:
                         st.markdown('<div class="kb-action-btn">', unsafe_allow_html=True)
-                        if st.button("🗑️", disabled=(len(edited.loc[edited["Select"] == True, "_id"].tolist()) == 0), key="kb_inline_delete_sel", help="Delete selected"):
-                            del_count = 0
-                            for pid in edited.loc[edited["Select"] == True, "_id"].tolist():
-                                # Call delete webhook (JSON body)
-                                try:
-                                    upload_url = (str(
-                                        (CONFIG_TOML.get("custom", {}) or {}).get("UPLOAD_WEBHOOK_URL")
-                                        or CONFIG_TOML.get("UPLOAD_WEBHOOK_URL")
-                                        or ((st.secrets.get("configurl") if hasattr(st, "secrets") else None))
-                                        or st.secrets.get("upload_url")
-                                        or os.environ.get("CONFIG_URL")
-                                        or os.environ.get("UPLOAD_WEBHOOK_URL")
-                                        or ""
-                                    )).strip()
-                                except Exception:
-                                    upload_url = ""
-                                if not upload_url:
-                                    st.toast("Upload webhook URL not configured; delete webhook not sent.", icon="⚠️")
-                                if upload_url:
+                        if st.button("🗑️", disabled=(len(selected_ids) == 0), key="kb_inline_delete_sel", help="Delete selected"):
+                            del_pids = selected_ids
+                            # Call delete webhook (JSON body) once per row, fanned out on the worker pool
+                            upload_url = _get_upload_url()
+                            if not upload_url:
+                                st.toast("Upload webhook URL not configured; delete webhook not sent.", icon="⚠️")
+                            if upload_url and del_pids:
+                                now_iso = time.strftime("%Y-%m-%dT%H:%M:%S")
+                                payloads = []
+                                for pid in del_pids:
+                                    cur = None
                                     try:
+                                        cur = products_by_id.get(pid) or store.get(pid)
+                                    except Exception:
                                         cur = None
-                                        try:
-                                            cur = next((p for p in products if p.get("id") == pid), None) or store.get(pid)
-                                        except Exception:
-                                            cur = None
-                                        user_email = ((st.session_state.get("user") or {}).get("email") or "").strip().lower()
-                                        pdfp = (cur or {}).get("pdf_path", "") or os.path.join(PDF_DIR, f"{pid}.pdf")
-                                        _payload = {
-                                            "id": pid,
-                                            "name": (cur or {}).get("name", ""),
-                                            "operation": "delete",
-                                            "description": (cur or {}).get("description", ""),
-                                            "pdf_path": pdfp,
-                                            "created_by": (cur or {}).get("created_by", ""),
-                                            "created_at": (cur or {}).get("created_at", ""),
-                                            "updated_by": user_email,
-                                            "updated_at": datetime.now().isoformat(timespec="seconds"),
-                                        }
-                                        st.info(f"Calling delete webhook: {upload_url}")
-                                        _r = requests.post(upload_url, json=_payload, timeout=10)
-                                        try:
-                                            _j = _r.json()
-                                            if not bool(_j.get("success")):
-                                                st.warning(str(_j.get("message") or "Delete webhook did not confirm success"))
-                                        except Exception:
-                                            st.warning(f"Delete webhook responded without JSON (status {getattr(_r,'status_code',None)}): {getattr(_r,'text','')[:200]}")
+                                    pdfp = (cur or {}).get("pdf_path", "") or os.path.join(PDF_DIR, f"{pid}.pdf")
+                                    payloads.append({
+                                        "id": pid,
+                                        "name": (cur or {}).get("name", ""),
+                                        "operation": "delete",
+                                        "description": (cur or {}).get("description", ""),
+                                        "pdf_path": pdfp,
+                                        "created_by": (cur or {}).get("created_by", ""),
+                                        "created_at": (cur or {}).get("created_at", ""),
+                                        "updated_by": user_email,
+                                        "updated_at": now_iso,
+                                    })
+                                st.info(f"Calling delete webhook: {upload_url}")
+                                http = _http()
+
+                                def _post_delete(payload):
+                                    try:
+                                        return http.post(upload_url, json=payload, timeout=10)
                                     except Exception:
+                                        return None
+
+                                for _r in _http_executor().map(_post_delete, payloads):
+                                    if _r is None:
                                         st.warning("Failed to call delete webhook for selected row")
-                                # Removed: store.delete(pid) - using database only
-                                del_count += 1
-                                try:
-                                    pdfp = os.path.join(PDF_DIR, f"{pid}.pdf")
-                                    if os.path.exists(pdfp): os.remove(pdfp)
-                                except Exception:
-                                    pass
-                                try:
-                                    chunkp = os.path.join(TEXT_DIR, f"{pid}.json")
-                                    if os.path.exists(chunkp): os.remove(chunkp)
-                                except Exception:
-                                    pass
+                                        continue
+                                    try:
+                                        _j = _r.json()
+                                        if not bool(_j.get("success")):
+                                            st.warning(str(_j.get("message") or "Delete webhook did not confirm success"))
+                                    except Exception:
+                                        st.warning(f"Delete webhook responded without JSON (status {getattr(_r,'status_code',None)}): {getattr(_r,'text','')[:200]}")
+                            # Removed: store.delete(pid) - using database only
+                            del_count = len(del_pids)
+                            if del_pids:
+                                _executor().submit(_remove_product_files, del_pids)
                             if del_count:
                                 st.success(f"Deleted {del_count} row(s).")
                             else:
                                 st.info("No rows deleted.")
+                            _bump_store_version()
                             st.rerun()
                         st.markdown('</div>', unsafe_allow_html=True)
                     with btn_edit:
                         st.markdown('<div class="kb-action-btn">', unsafe_allow_html=True)
-                        if st.button("✏️", disabled=(len(edited.loc[edited["Select"] == True, "_id"].tolist()) != 1), key="kb_inline_edit_sel", help="Edit selected"):
-                            pid = edited.loc[edited["Select"] == True, "_id"].tolist()[0]
+                        if st.button("✏️", disabled=(len(selected_ids) != 1), key="kb_inline_edit_sel", help="Edit selected"):
+                            pid = selected_ids[0]
                             st.session_state["kb_selected_rows"] = [{"id": pid}]
                             st.rerun()
                         st.markdown('</div>', unsafe_allow_html=True)
 
-                # Auto-apply inline edits immediately (compare edited vs original df by _id)
-                try:
-                    original_by_id = {str(r["_id"]): r for _, r in df.iterrows()}
-                    updated_count = 0
-                    for _, row in edited.iterrows():
-                        pid = str(row.get("_id") or "")
-                        if not pid:
-                            continue
-                        cur = original_by_id.get(pid)
-                        if not cur:
-                            continue
-                        new_name = str(row.get("Knowledgebase name") or "")
-                        new_desc = str(row.get("Description") or "")
-                        if new_name != (cur.get("Knowledgebase name") or "") or new_desc != (cur.get("Description") or ""):
-                            cur_store = next((p for p in products if p.get("id") == pid), None)
-                            user_email = ((st.session_state.get("user") or {}).get("email") or "").strip().lower()
-                            # Removed: store.upsert() - using database only
-                            updated_count += 1
-                    if updated_count:
-                        st.success(f"Updated {updated_count} row(s).")
-                        st.rerun()
-                except Exception:
-                    pass
-
 # ---------------------- Dashbord Page ----------------------
 elif page == "Dashbord":
 
@@ -2148,12 +2270,11 @@ elif page == "Dashbord":
 # ---------------------- aarya Page ----------------------
 elif page == "Aarya":
 
-    repo = get_pdf_metadata_repo()
-    products = _enrich_rows_with_status_label(repo.list_all())
+    products = _list_products(_store_version())
     if not products:
         st.info("No products available. An admin must create one first.")
     else:
-        name_to_id = {p["name"]: p["id"] for p in products}
+        name_to_id = _name_to_id(_store_version())
         
         # Auto-initialize WebSocket connection on page load
         if "aarya_session_id" not in st.session_state:
@@ -2387,32 +2508,45 @@ elif page == "Aarya":
         # Toolbar: keep default Streamlit controls (e.g., theme toggle) with no overlays
 
         # Chat UI
-        chat_key = f"chat_{selected_id}"
+        chat_store = get_chat_store()
+        chat_user = ((st.session_state.get("user") or {}).get("email") or "").strip().lower()
+        # Scoped to the signed-in user so a later sign-in in this browser session never sees it
+        chat_key = f"chat_{user_key(chat_user)}_{selected_id}"
         if chat_key not in st.session_state["chat_histories"]:
-            st.session_state["chat_histories"][chat_key] = []
-
-        # Render history first (assistant messages right-aligned with reactions)
-        for i, msg in enumerate(st.session_state["chat_histories"][chat_key]):
-            role = msg.get("role")
-            text = msg.get("content", "")
-            ts = msg.get("ts") or ""
-            msg_id_for_resp = msg.get("msg_id") or f"{chat_key}_msg_{i}"
-            like = int(msg.get("like", 0))
-            dislike = int(msg.get("dislike", 0))
+            st.session_state["chat_histories"][chat_key] = chat_store.tail(chat_user, selected_id, CHAT_HISTORY_LIMIT)
+
+        # Render history first (assistant messages right-aligned with reactions).
+        # Only the newest render_n messages are emitted; "Show earlier" pages back further.
+        history = st.session_state["chat_histories"][chat_key]
+        render_counts = st.session_state.setdefault("chat_render_n", {})
+        render_n = render_counts.get(chat_key, CHAT_RENDER_WINDOW)
+        window_start = max(0, len(history) - render_n)
+        if window_start:
+            if st.button(f"Show {min(window_start, CHAT_RENDER_WINDOW)} earlier messages", key=f"{chat_key}_show_earlier"):
+                render_counts[chat_key] = render_n + CHAT_RENDER_WINDOW
+                st.rerun()
+        # Runs of user messages have no widgets, so they are emitted as a single HTML element.
+        user_html_parts: List[str] = []
+        for i in range(window_start, len(history)):
+            msg = history[i]
+            role = msg.role
+            text = msg.content or ""
+            ts = msg.ts or ""
+            if role != "assistant":
+                user_html_parts.append(_render_msg(role, text, ts))
+                continue
+            if user_html_parts:
+                st.markdown("".join(user_html_parts), unsafe_allow_html=True)
+                user_html_parts = []
+            msg_id_for_resp = msg.msg_id or f"{chat_key}_msg_{i}"
+            like = int(msg.like)
+            dislike = int(msg.dislike)
 
             if role == "assistant":
                 left, right = st.columns([5,7])
                 with right:
-                    st.markdown("<div class='msg-header right'><span class='name'>AARYA</span><span class='avatar avatar-assistant'>A</span></div>", unsafe_allow_html=True)
-                    # Render markdown for assistant responses with custom styling
-                    st.markdown(
-                        f"""<div class="assistant-msg-wrapper">
-                        
-{text}
-
-</div>""",
-                        unsafe_allow_html=True
-                    )
+                    # Header and markdown body in one element
+                    st.markdown(_render_msg(role, text, ts), unsafe_allow_html=True)
                     # Right-aligned meta row (timestamp + reactions)
                     meta = st.columns([9, 4])
                     # Like/Dislike controls for assistant messages
@@ -2428,8 +2562,8 @@ elif page == "Aarya":
                     try:
                         if i > 0:
                             prev_msg = st.session_state["chat_histories"][chat_key][i-1]
-                            if (prev_msg or {}).get("role") == "user":
-                                prev_user_text = str(prev_msg.get("content") or "")
+                            if prev_msg.role == "user":
+                                prev_user_text = str(prev_msg.content or "")
                     except Exception:
                         prev_user_text = ""
 
@@ -2452,7 +2586,7 @@ elif page == "Aarya":
                                         "name": selected_name,
                                         "type": "message",
                                         "message": text,  # send response text
-                                        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+                                        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
                                         "client_id": st.session_state.get("aarya_session_id", ""),
                                         "workflow_id": _get_workflow_id(),
                                         "action_code": "1",
@@ -2463,12 +2597,13 @@ elif page == "Aarya":
                                     pass
                                 # Toggle like; only one reaction at a time
                                 cur = st.session_state["chat_histories"][chat_key][i]
-                                if int(cur.get("like", 0)) == 1:
-                                    cur["like"] = 0
-                                    cur["dislike"] = 0
+                                if int(cur.like) == 1:
+                                    cur.like = 0
+                                    cur.dislike = 0
                                 else:
-                                    cur["like"] = 1
-                                    cur["dislike"] = 0
+                                    cur.like = 1
+                                    cur.dislike = 0
+                                _persist_reaction(chat_store, chat_user, selected_id, cur)
                                 st.rerun()
                         with grp[1]:
                             if st.button(" ", key=dislike_key, help="Dislike", disabled=disable_dislike_btn):
@@ -2486,7 +2621,7 @@ elif page == "Aarya":
                                         "name": selected_name,
                                         "type": "message",
                                         "message": text,
-                                        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+                                        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
                                         "client_id": st.session_state.get("aarya_session_id", ""),
                                         "workflow_id": _get_workflow_id(),
                                         "action_code": "2",
@@ -2496,12 +2631,13 @@ elif page == "Aarya":
                                 except Exception:
                                     pass
                                 cur = st.session_state["chat_histories"][chat_key][i]
-                                if int(cur.get("dislike", 0)) == 1:
-                                    cur["like"] = 0
-                                    cur["dislike"] = 0
+                                if int(cur.dislike) == 1:
+                                    cur.like = 0
+                                    cur.dislike = 0
                                 else:
-                                    cur["like"] = 0
-                                    cur["dislike"] = 1
+                                    cur.like = 0
+                                    cur.dislike = 1
+                                _persist_reaction(chat_store, chat_user, selected_id, cur)
                                 st.rerun()
                         # Timestamp, right-aligned inside the group
                         grp[2].markdown(f"<div style='text-align:right' class='chat-ts'>{ts}</div>", unsafe_allow_html=True)
@@ -2595,39 +2731,27 @@ elif page == "Aarya":
                             """,
                             unsafe_allow_html=True,
                         )
-            else:
-                # Escape HTML/XML characters for user messages
-                text_escaped = html.escape(text).replace('\n', '<br>')
-                left, right = st.columns([8,4])
-                with left:
-                    st.markdown("<div class='msg-header'><span class='avatar avatar-user'>Y</span><span class='name'>You</span></div>", unsafe_allow_html=True)
-                    st.markdown(f"<div class='bubble-user'>{text_escaped}</div>", unsafe_allow_html=True)
-                    st.markdown(f"<div class='meta-row'>{ts}</div>", unsafe_allow_html=True)
+        if user_html_parts:
+            st.markdown("".join(user_html_parts), unsafe_allow_html=True)
 
         # Modern chat input
         user_msg = st.chat_input("Ask about the selected Knowledgebase...")
         if user_msg:
             # Immediately add user message to chat history
-            now = datetime.now().strftime("%Y-%m-%d %H:%M")
-            st.session_state["chat_histories"][chat_key].append({
-                "role": "user",
-                "content": user_msg,
-                "ts": now,
-                "like": 0,
-                "dislike": 0,
-            })
+            now = time.strftime("%Y-%m-%d %H:%M")
+            user_entry = Msg(role="user", content=user_msg, ts=now)
+            st.session_state["chat_histories"][chat_key].append(user_entry)
+            try:
+                chat_store.append(chat_user, selected_id, user_entry)
+            except Exception:
+                pass
             
             # Add placeholder for assistant response with typing indicator
             assistant_index = len(st.session_state["chat_histories"][chat_key])
             resp_msg_id = f"msg_id-{int(time.time()*1000)}"
-            st.session_state["chat_histories"][chat_key].append({
-                "role": "assistant",
-                "content": "💬 Typing...",
-                "ts": now,
-                "msg_id": resp_msg_id,
-                "like": 0,
-                "dislike": 0,
-            })
+            st.session_state["chat_histories"][chat_key].append(
+                Msg(role="assistant", content="💬 Typing...", ts=now, msg_id=resp_msg_id)
+            )
             
             # Send WebSocket request in background
             ws_url = _get_ws_url()
@@ -2676,7 +2800,12 @@ elif page == "Aarya":
             
             if answer:
                 # Update typing indicator with actual response
-                st.session_state["chat_histories"][pending["chat_key"]][pending["assistant_index"]]["content"] = answer
+                answer_entry = st.session_state["chat_histories"][pending["chat_key"]][pending["assistant_index"]]
+                answer_entry.content = answer
+                try:
+                    chat_store.append(chat_user, pending["payload"].get("knowledge_id") or selected_id, answer_entry)
+                except Exception:
+                    pass
             else:
                 # Remove the typing indicator if no response
                 st.session_state["chat_histories"][pending["chat_key"]].pop(pending["assistant_index"])
@@ -7,6 +7,51 @@ from lib.pdf_metadata_repo import PdfMetadataRepository
 from lib.clients_metadata_repo import ClientsMetadataRepository
 
 
+def _kpi_row_html(cards: tuple) -> str:
+    """Render a row of KPI cards as one HTML grid.
+
+    ``cards`` is a tuple of ``(title, value, icon, value_title, icon_title)``
+    tuples; values are escaped here so callers pass plain text.
+    """
+    parts = []
+    for title, value, icon, value_title, icon_title in cards:
+        vt = f" title='{html.escape(value_title, quote=True)}'" if value_title else ""
+        it = f" title='{html.escape(icon_title, quote=True)}'" if icon_title else ""
+        parts.append(
+            f"<div class='kpi-card'><div class='kpi-title'>{html.escape(title)}</div>"
+            f"<div class='kpi-row'><div class='kpi-value'{vt}>{html.escape(value)}</div>"
+            f"<div class='kpi-icon'{it}>{html.escape(icon)}</div></div></div>"
+        )
+    return "<div class='kpi-grid'>" + "".join(parts) + "</div>"
+
+
+@st.cache_data(ttl=15, show_spinner=False)
+def _status_counts(engine_url: str, _repo: PdfMetadataRepository) -> dict:
+    """pdf_metadata ``{status: count}`` grouped in SQL; keyed by engine URL, ``_repo`` is unhashed."""
+    try:
+        return _repo.count_by_status()
+    except Exception:
+        return {}
+
+
+@st.cache_data(ttl=15, show_spinner=False)
+def _knowledge_name(engine_url: str, knowledge_id: str, _repo: PdfMetadataRepository):
+    """Name of one knowledgebase via a primary-key lookup; ``_repo`` is unhashed."""
+    try:
+        return _repo.get_name(knowledge_id)
+    except Exception:
+        return None
+
+
+@st.cache_data(ttl=15, show_spinner=False)
+def _load_client_kpis(engine_url: str, _repo: ClientsMetadataRepository) -> dict:
+    """clients_metadata KPIs from a single query; ``_repo`` is unhashed."""
+    try:
+        return _repo.kpi_bundle()
+    except Exception:
+        return {"sessions": 0, "total_requests": 0, "unique_users": 0, "most_used_knowledge": None}
+
+
 class Dashboard:
     def __init__(self) -> None:
         # lazy-init repo to avoid import issues on module load
@@ -16,27 +61,21 @@ class Dashboard:
     def _get_repo(self) -> PdfMetadataRepository:
         if self._repo is None:
             db = DatabaseConfig(base_dir=os.path.dirname(__file__))
-            engine = db.create_engine()
-            self._repo = PdfMetadataRepository(engine)
+            self._repo = PdfMetadataRepository(db.shared_engine())
         return self._repo
 
     def _get_clients_repo(self) -> ClientsMetadataRepository:
         if self._clients_repo is None:
             db = DatabaseConfig(base_dir=os.path.dirname(__file__))
-            engine = db.create_engine()
-            self._clients_repo = ClientsMetadataRepository(engine)
+            self._clients_repo = ClientsMetadataRepository(db.shared_engine())
         return self._clients_repo
 
     def _fetch_counts(self):
-        @st.cache_data(ttl=15, show_spinner=False)
-        def _load_counts():
-            try:
-                rows_local = self._get_repo().list_all()
-            except Exception:
-                rows_local = []
-            return rows_local
-
-        rows = _load_counts()
+        try:
+            repo = self._get_repo()
+            by_status = _status_counts(str(repo.engine.url), repo)
+        except Exception:
+            by_status = {}
 
         def norm_status(v):
             if v is None:
@@ -53,34 +92,42 @@ class Dashboard:
                 return "Deleted"
             return s
 
-        statuses = [norm_status(r.get("status")) for r in rows]
-        active_rows = [r for r, s in zip(rows, statuses) if s.lower() != "deleted"]
-        success = sum(1 for s in statuses if s.lower() == "success")
-        in_progress = sum(1 for s in statuses if s.lower() in ("in progress", "in_progress", "processing"))
-        deleted = sum(1 for s in statuses if s.lower() == "deleted")
+        # Raw statuses like "1" and "Success" fold into the same bucket
+        counts = {}
+        for status, n in by_status.items():
+            key = norm_status(status).lower()
+            counts[key] = counts.get(key, 0) + n
+
+        total = sum(counts.values())
+        success = counts.get("success", 0)
+        in_progress = sum(counts.get(k, 0) for k in ("in progress", "in_progress", "processing"))
+        deleted = counts.get("deleted", 0)
 
         return {
-            "total": len(rows),
-            "active_total": len(active_rows),
+            "total": total,
+            "active_total": total - deleted,
             "success": success,
             "in_progress": in_progress,
             "deleted": deleted,
         }
 
+    def _client_kpis(self) -> dict:
+        try:
+            repo = self._get_clients_repo()
+        except Exception:
+            return {"sessions": 0, "total_requests": 0, "unique_users": 0, "most_used_knowledge": None}
+        return _load_client_kpis(str(repo.engine.url), repo)
+
     def _fetch_conversation_stats(self):
         @st.cache_data(ttl=15, show_spinner=False)
-        def _load_conv():
-            try:
-                total = self._get_clients_repo().count_distinct_sessions()
-            except Exception:
-                total = 0
+        def _load_recent():
             try:
-                recent_local = self._get_clients_repo().list_recent(25)
+                return self._get_clients_repo().list_recent(25)
             except Exception:
-                recent_local = []
-            return total, recent_local
+                return []
 
-        total_conversations, recent = _load_conv()
+        total_conversations = self._client_kpis()["sessions"]
+        recent = _load_recent()
 
         # Only keep selected columns for display
         cols = [
@@ -99,48 +146,22 @@ class Dashboard:
 
     def _fetch_client_aggregates(self):
         """Return totals from clients metadata and resolve most used knowledge name if possible."""
-        @st.cache_data(ttl=15, show_spinner=False)
-        def _load_aggs():
-            total_requests_l = 0
-            unique_users_l = 0
-            top_id_l = None
-            top_requests_l = 0
-            try:
-                total_requests_l = self._get_clients_repo().total_requests()
-            except Exception:
-                pass
-            try:
-                unique_users_l = self._get_clients_repo().count_unique_users()
-            except Exception:
-                pass
-            try:
-                top = self._get_clients_repo().most_used_knowledge() or {}
-                top_id_l = top.get("knowledge_id")
-                _rows = int(top.get("rows_count") or 0)
-                _msgs = int(top.get("msgs_sum") or 0)
-                top_requests_l = _rows if _rows > 0 else _msgs
-            except Exception:
-                top_id_l = None
-                top_requests_l = 0
-            return total_requests_l, unique_users_l, top_id_l, top_requests_l
-
-        total_requests, unique_users, top_id, top_requests = _load_aggs()
+        kpis = self._client_kpis()
+        total_requests = kpis["total_requests"]
+        unique_users = kpis["unique_users"]
+        top = kpis["most_used_knowledge"] or {}
+        top_id = top.get("knowledge_id")
+        top_rows = int(top.get("rows_count") or 0)
+        top_requests = top_rows if top_rows > 0 else int(top.get("msgs_sum") or 0)
 
         # Resolve Knowledgebase name from pdf_metadata by matching id as string
         top_name = None
         if top_id is not None:
-            @st.cache_data(ttl=15, show_spinner=False)
-            def _resolve_name(_sid: str):
-                try:
-                    all_rows_local = self._get_repo().list_all()
-                    match_local = next((r for r in all_rows_local if str(r.get("id")) == _sid), None)
-                    if match_local and match_local.get("name"):
-                        return str(match_local.get("name"))
-                except Exception:
-                    return None
-                return None
-            sid = str(top_id)
-            top_name = _resolve_name(sid)
+            try:
+                repo = self._get_repo()
+                top_name = _knowledge_name(str(repo.engine.url), str(top_id), repo)
+            except Exception:
+                top_name = None
 
         return {
             "total_requests": total_requests,
@@ -164,6 +185,7 @@ class Dashboard:
               .kpi-sub { font-size:12px; color:#6b7280; }
               .kpi-icon { font-size:20px; opacity:.9; }
               [data-testid="column"] { gap: 8px !important; }
+              .kpi-grid { display:grid; grid-template-columns: repeat(4, minmax(0, 1fr)); gap: 16px; }
             </style>
             """,
             unsafe_allow_html=True,
@@ -177,15 +199,15 @@ class Dashboard:
         t_deleted = f"{counts.get('deleted', 0):,}"
 
         #st.markdown("<div class='db-section-title'>Knowledgebase Overview</div>", unsafe_allow_html=True)
-        col1, col2, col3, col4 = st.columns(4)
-        with col1:
-            st.markdown(f"<div class='kpi-card'><div class='kpi-title'>Total Knowledge</div><div class='kpi-row'><div class='kpi-value'>{t_total}</div><div class='kpi-icon'>📚</div></div></div>", unsafe_allow_html=True)
-        with col2:
-            st.markdown(f"<div class='kpi-card'><div class='kpi-title'>Active</div><div class='kpi-row'><div class='kpi-value'>{t_active}</div><div class='kpi-icon'>✅</div></div></div>", unsafe_allow_html=True)
-        with col3:
-            st.markdown(f"<div class='kpi-card'><div class='kpi-title'>In Progress</div><div class='kpi-row'><div class='kpi-value'>{t_inprog}</div><div class='kpi-icon'>⏳</div></div></div>", unsafe_allow_html=True)
-        with col4:
-            st.markdown(f"<div class='kpi-card'><div class='kpi-title'>Deleted</div><div class='kpi-row'><div class='kpi-value'>{t_deleted}</div><div class='kpi-icon'>🗑️</div></div></div>", unsafe_allow_html=True)
+        st.markdown(
+            _kpi_row_html((
+                ("Total Knowledge", t_total, "📚", "", ""),
+                ("Active", t_active, "✅", "", ""),
+                ("In Progress", t_inprog, "⏳", "", ""),
+                ("Deleted", t_deleted, "🗑️", "", ""),
+            )),
+            unsafe_allow_html=True,
+        )
 
         st.divider()
 
@@ -193,30 +215,16 @@ class Dashboard:
         conv_total, conv_recent = self._fetch_conversation_stats()
         #st.markdown("<div class='db-section-title'>Conversations</div>", unsafe_allow_html=True)
         aggs = self._fetch_client_aggregates()
-        c1, c2, c3, c4 = st.columns(4)
-        with c1:
-            st.markdown(f"<div class='kpi-card'><div class='kpi-title'>Conversations</div><div class='kpi-row'><div class='kpi-value'>{conv_total:,}</div><div class='kpi-icon'>💬</div></div></div>", unsafe_allow_html=True)
-        with c2:
-            st.markdown(f"<div class='kpi-card'><div class='kpi-title'>Hits</div><div class='kpi-row'><div class='kpi-value'>{aggs.get('total_requests', 0):,}</div><div class='kpi-icon'>📈</div></div></div>", unsafe_allow_html=True)
-        with c3:
-            st.markdown(f"<div class='kpi-card'><div class='kpi-title'>Users</div><div class='kpi-row'><div class='kpi-value'>{aggs.get('unique_users', 0):,}</div><div class='kpi-icon'>👤</div></div></div>", unsafe_allow_html=True)
-        with c4:
-            full_label = str(aggs.get("most_used_name") or (aggs.get("most_used_id") or "—"))
-            short_label = full_label[:6]
-            safe_full = html.escape(full_label)
-            safe_short = html.escape(short_label)
-            reqs = f"{aggs.get('most_used_requests', 0):,}"
-            st.markdown(
-                f"<div class='kpi-card'>"
-                f"  <div class='kpi-title'>Most Used Knowledge</div>"
-                f"  <div class='kpi-row'>"
-                f"    <div>"
-                f"      <div class='kpi-value' title='{safe_full}'>{safe_short}</div>"
-                f"    </div>"
-                f"    <div class='kpi-icon' title='{reqs} requests'>⬆️ {reqs}</div>"
-                f"  </div>"
-                f"</div>",
-                unsafe_allow_html=True,
-            )
+        full_label = str(aggs.get("most_used_name") or (aggs.get("most_used_id") or "—"))
+        reqs = f"{aggs.get('most_used_requests', 0):,}"
+        st.markdown(
+            _kpi_row_html((
+                ("Conversations", f"{conv_total:,}", "💬", "", ""),
+                ("Hits", f"{aggs.get('total_requests', 0):,}", "📈", "", ""),
+                ("Users", f"{aggs.get('unique_users', 0):,}", "👤", "", ""),
+                ("Most Used Knowledge", full_label[:6], f"⬆️ {reqs}", full_label, f"{reqs} requests"),
+            )),
+            unsafe_allow_html=True,
+        )
 
        
\ No newline at end of file
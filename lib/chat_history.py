@@ -0,0 +1,94 @@
+import os
+import re
+import json
+import hashlib
+from collections import deque
+from dataclasses import dataclass, asdict, fields
+from typing import List
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+@dataclass(slots=True)
+class Msg:
+    """A single chat message kept in session state and persisted as one JSONL line."""
+    role: str
+    content: str
+    ts: str = ""
+    msg_id: str = ""
+    like: int = 0
+    dislike: int = 0
+
+
+_MSG_FIELDS = frozenset(f.name for f in fields(Msg))
+# JSONL records with this role carry like/dislike for an earlier msg_id, not a message
+REACTION_ROLE = "reaction"
+
+
+def user_key(user: str) -> str:
+    """Stable, filename- and widget-key-safe id for a user's normalized email."""
+    normalized = (user or "anonymous").strip().lower()
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ChatHistoryStore:
+    """Append-only JSONL chat history, one file per (user, knowledgebase)."""
+
+    def __init__(self, chats_dir: str):
+        self.chats_dir = chats_dir
+        os.makedirs(self.chats_dir, exist_ok=True)
+
+    def _path(self, user: str, product_id: str) -> str:
+        # Hash rather than sanitize: distinct emails (a+b@x, a_b@x) must never share a file
+        user_part = user_key(user)
+        pid_part = _UNSAFE.sub("_", str(product_id))
+        return os.path.join(self.chats_dir, f"{user_part}_{pid_part}.jsonl")
+
+    def append(self, user: str, product_id: str, msg: Msg):
+        self._append_record(user, product_id, asdict(msg))
+
+    def append_reaction(self, user: str, product_id: str, msg_id: str, like: int, dislike: int):
+        """Record feedback for an earlier message; ``tail`` folds it onto that message."""
+        self._append_record(
+            user,
+            product_id,
+            {"role": REACTION_ROLE, "msg_id": msg_id, "like": int(like), "dislike": int(dislike)},
+        )
+
+    def _append_record(self, user: str, product_id: str, record: dict):
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        # O_APPEND keeps concurrent writers (several tabs) from interleaving lines
+        fd = os.open(self._path(user, product_id), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def tail(self, user: str, product_id: str, limit: int = 200) -> List[Msg]:
+        path = self._path(user, product_id)
+        if not os.path.exists(path):
+            return []
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                lines = deque(f, maxlen=limit)
+        except Exception:
+            return []
+        messages = []
+        by_id = {}
+        for line in lines:
+            try:
+                data = json.loads(line)
+                if data.get("role") == REACTION_ROLE:
+                    # Latest reaction wins; reactions for messages outside the tail are dropped
+                    target = by_id.get(data.get("msg_id"))
+                    if target is not None:
+                        target.like = int(data.get("like") or 0)
+                        target.dislike = int(data.get("dislike") or 0)
+                    continue
+                msg = Msg(**{k: v for k, v in data.items() if k in _MSG_FIELDS})
+            except Exception:
+                continue
+            messages.append(msg)
+            if msg.msg_id:
+                by_id[msg.msg_id] = msg
+        return messages
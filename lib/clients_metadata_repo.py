@@ -10,6 +10,8 @@ from sqlalchemy import (
     MetaData,
     select,
     func,
+    true,
+    bindparam,
 )
 from sqlalchemy.engine import Engine, Result
 
@@ -33,63 +35,82 @@ class ClientsMetadataRepository:
             extend_existing=True,
         )
         # Do not create the table here; assume it already exists in the DB
+        self._build_statements()
+
+    def _build_statements(self) -> None:
+        """Build read statements once; per-call values travel as bound parameters."""
+        t = self.table
+        newest_first = select(t).order_by(t.c.sl_no.desc())
+        self._stmt_list_all = newest_first
+        self._stmt_list_recent = newest_first.limit(bindparam("n", type_=Integer))
+        self._stmt_sessions = select(func.count(func.distinct(t.c.sessionId)))
+        self._stmt_total = select(func.count()).select_from(t)
+        # Treat empty strings as NULL for uniqueness
+        self._stmt_users = select(func.count(func.distinct(func.nullif(t.c.client_email, ""))))
+        # Top knowledge by total rows; also includes msgs_sum for reference
+        top = (
+            select(
+                t.c.knowledge_id,
+                func.count().label("rows_count"),
+                func.coalesce(func.sum(t.c.msg_count), 0).label("msgs_sum"),
+            )
+            .where(t.c.knowledge_id.isnot(None))
+            .group_by(t.c.knowledge_id)
+            .order_by(func.count().desc())
+            .limit(1)
+        )
+        self._stmt_most_used = top
+        totals = (
+            select(
+                func.count(func.distinct(t.c.sessionId)).label("sessions"),
+                func.count().label("total_requests"),
+                func.count(func.distinct(func.nullif(t.c.client_email, ""))).label("unique_users"),
+            )
+            .select_from(t)
+            .subquery("totals")
+        )
+        top_sq = top.subquery("top")
+        self._stmt_kpi_bundle = select(totals, top_sq.c.knowledge_id, top_sq.c.rows_count, top_sq.c.msgs_sum).select_from(
+            totals.outerjoin(top_sq, true())
+        )
 
     def _row_to_dict(self, row) -> Dict[str, Any]:
         return dict(row._mapping)
 
     def list_all(self) -> List[Dict[str, Any]]:
-        stmt = select(self.table).order_by(self.table.c.sl_no.desc())
         with self.engine.connect() as conn:
-            result: Result = conn.execute(stmt)
+            result: Result = conn.execute(self._stmt_list_all)
             rows = result.fetchall()
         return [self._row_to_dict(r) for r in rows]
 
     def list_recent(self, limit: int = 50) -> List[Dict[str, Any]]:
-        stmt = select(self.table).order_by(self.table.c.sl_no.desc()).limit(limit)
         with self.engine.connect() as conn:
-            result: Result = conn.execute(stmt)
+            result: Result = conn.execute(self._stmt_list_recent, {"n": int(limit)})
             rows = result.fetchall()
         return [self._row_to_dict(r) for r in rows]
 
     def count_distinct_sessions(self) -> int:
-        stmt = select(func.count(func.distinct(self.table.c.sessionId)))
         with self.engine.connect() as conn:
-            result: Result = conn.execute(stmt)
+            result: Result = conn.execute(self._stmt_sessions)
             val = result.scalar() or 0
         return int(val)
 
     def total_requests(self) -> int:
         # Total requests = total records in n8n_clients_metadata
-        stmt = select(func.count()).select_from(self.table)
         with self.engine.connect() as conn:
-            result: Result = conn.execute(stmt)
+            result: Result = conn.execute(self._stmt_total)
             val = result.scalar() or 0
         return int(val)
 
     def count_unique_users(self) -> int:
-        # Treat empty strings as NULL for uniqueness
-        col = func.nullif(self.table.c.client_email, "")
-        stmt = select(func.count(func.distinct(col)))
         with self.engine.connect() as conn:
-            result: Result = conn.execute(stmt)
+            result: Result = conn.execute(self._stmt_users)
             val = result.scalar() or 0
         return int(val)
 
     def most_used_knowledge(self) -> Optional[Dict[str, Any]]:
-        # Returns top knowledge by total rows; also includes msgs_sum for reference
-        stmt = (
-            select(
-                self.table.c.knowledge_id,
-                func.count().label("rows_count"),
-                func.coalesce(func.sum(self.table.c.msg_count), 0).label("msgs_sum"),
-            )
-            .where(self.table.c.knowledge_id.isnot(None))
-            .group_by(self.table.c.knowledge_id)
-            .order_by(func.count().desc())
-            .limit(1)
-        )
         with self.engine.connect() as conn:
-            result: Result = conn.execute(stmt)
+            result: Result = conn.execute(self._stmt_most_used)
             row = result.fetchone()
         if not row:
             return None
@@ -99,3 +120,26 @@ class ClientsMetadataRepository:
             "rows_count": int(d.get("rows_count") or 0),
             "msgs_sum": int(d.get("msgs_sum") or 0),
         }
+
+    def kpi_bundle(self) -> Dict[str, Any]:
+        """Dashboard KPIs in one round-trip.
+
+        Returns ``sessions``, ``total_requests``, ``unique_users`` and the
+        ``most_used_knowledge`` dict (or None), matching the single-purpose methods above.
+        """
+        # The ungrouped totals always yield exactly one row, even on an empty table
+        with self.engine.connect() as conn:
+            d = conn.execute(self._stmt_kpi_bundle).mappings().one()
+        most_used = None
+        if d.get("knowledge_id") is not None:
+            most_used = {
+                "knowledge_id": d.get("knowledge_id"),
+                "rows_count": int(d.get("rows_count") or 0),
+                "msgs_sum": int(d.get("msgs_sum") or 0),
+            }
+        return {
+            "sessions": int(d.get("sessions") or 0),
+            "total_requests": int(d.get("total_requests") or 0),
+            "unique_users": int(d.get("unique_users") or 0),
+            "most_used_knowledge": most_used,
+        }
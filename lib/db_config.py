@@ -1,4 +1,6 @@
 import os
+import threading
+from functools import lru_cache
 from typing import Dict, Any
 
 try:
@@ -12,6 +14,18 @@ except Exception:  # pragma: no cover
     _sa_create_engine = None
 
 
+@lru_cache(maxsize=8)
+def _load_cached(path: str) -> Dict[str, Any]:
+    """Parse a TOML file once per path; treat the result as read-only."""
+    with open(path, "rb") as f:
+        return _toml.load(f)  # type: ignore[arg-type]
+
+
+# Engines are pooled per URL and shared by every caller in the process
+_ENGINES: Dict[str, Any] = {}
+_ENGINES_LOCK = threading.Lock()
+
+
 class DatabaseConfig:
     """Helper to load database configuration from .streamlit/config.toml.
 
@@ -34,14 +48,14 @@ class DatabaseConfig:
             self._cfg = {}
             return
         try:
-            with open(cfg_path, "rb") as f:
-                data = _toml.load(f)  # type: ignore[arg-type]
+            data = _load_cached(cfg_path)
         except Exception:
             data = {}
         self._cfg = data.get("database", {}) if isinstance(data, dict) else {}
 
     def reload(self) -> None:
         """Reload config from disk."""
+        _load_cached.cache_clear()
         self._load()
 
     def as_dict(self) -> Dict[str, Any]:
@@ -98,3 +112,23 @@ class DatabaseConfig:
             raise RuntimeError("SQLAlchemy is not available. Please install 'SQLAlchemy' in requirements.txt.")
         url = self.build_url()
         return _sa_create_engine(url, **kwargs)
+
+    def shared_engine(self):
+        """Return a process-wide Engine for the configured URL, creating it once.
+
+        Connections are pinged on checkout and recycled after 30 minutes so
+        MySQL's wait_timeout never hands out a dead connection.
+        """
+        url = self.build_url()
+        engine = _ENGINES.get(url)
+        if engine is not None:
+            return engine
+        with _ENGINES_LOCK:
+            engine = _ENGINES.get(url)
+            if engine is None:
+                kwargs: Dict[str, Any] = {"pool_pre_ping": True, "pool_recycle": 1800}
+                if self.get_driver() != "sqlite":
+                    kwargs["pool_size"] = 5
+                engine = self.create_engine(**kwargs)
+                _ENGINES[url] = engine
+        return engine
@@ -0,0 +1,26 @@
+import json
+from typing import Any
+
+try:
+    import orjson as _orjson  # optional C-accelerated codec
+except Exception:  # pragma: no cover
+    _orjson = None
+
+
+def load_file(path: str) -> Any:
+    """Parse a UTF-8 JSON file, using orjson when it is installed."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_file(obj: Any, path: str) -> None:
+    """Write ``obj`` as indented UTF-8 JSON (non-ASCII kept as-is)."""
+    if _orjson is not None:
+        data = _orjson.dumps(obj, option=_orjson.OPT_INDENT_2)
+    else:
+        data = json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(data)
@@ -12,9 +12,11 @@ from sqlalchemy import (
     DateTime,
     MetaData,
     select,
+    func,
     insert,
     update,
     delete,
+    bindparam,
 )
 from sqlalchemy.engine import Engine, Result
 
@@ -57,6 +59,15 @@ class PdfMetadataRepository:
 
         # Create table if it does not exist. In production you might manage this via migrations instead.
         self.metadata.create_all(self.engine, tables=[self.table], checkfirst=True)
+        self._build_statements()
+
+    def _build_statements(self) -> None:
+        """Build read statements once; per-call values travel as bound parameters."""
+        t = self.table
+        self._stmt_list_all = select(t).order_by(t.c.created_at.desc())
+        self._stmt_get = select(t).where(t.c.id == bindparam("id", type_=Integer))
+        self._stmt_get_name = select(t.c.name).where(t.c.id == bindparam("id", type_=Integer))
+        self._stmt_count_by_status = select(t.c.status, func.count()).group_by(t.c.status)
 
     # ---------------------- Helpers ----------------------
 
@@ -66,19 +77,34 @@ class PdfMetadataRepository:
     # ---------------------- CRUD Methods ----------------------
 
     def list_all(self) -> List[Dict[str, Any]]:
-        stmt = select(self.table).order_by(self.table.c.created_at.desc())
         with self.engine.connect() as conn:
-            result: Result = conn.execute(stmt)
+            result: Result = conn.execute(self._stmt_list_all)
             rows = result.fetchall()
         return [self._row_to_dict(r) for r in rows]
 
+    def count_by_status(self) -> Dict[Any, int]:
+        """Return ``{status: row_count}`` computed server-side with GROUP BY."""
+        with self.engine.connect() as conn:
+            result: Result = conn.execute(self._stmt_count_by_status)
+            rows = result.fetchall()
+        return {status: int(count) for status, count in rows}
+
     def get(self, id: int) -> Optional[Dict[str, Any]]:
-        stmt = select(self.table).where(self.table.c.id == id)
         with self.engine.connect() as conn:
-            result: Result = conn.execute(stmt)
+            result: Result = conn.execute(self._stmt_get, {"id": id})
             row = result.fetchone()
         return self._row_to_dict(row) if row else None
 
+    def get_name(self, id: Any) -> Optional[str]:
+        """Return only the name for one id; ``id`` may arrive as a string."""
+        try:
+            pk = int(id)
+        except (TypeError, ValueError):
+            return None
+        with self.engine.connect() as conn:
+            name = conn.execute(self._stmt_get_name, {"id": pk}).scalar()
+        return str(name) if name else None
+
     def insert(self, data: Dict[str, Any]) -> int:
         now = datetime.utcnow()
         if not data.get("created_at"):
@@ -1,9 +1,40 @@
+from collections import OrderedDict
 from typing import List
 from PyPDF2 import PdfReader
 import re
+import threading
 
+try:
+    import pypdfium2 as _pdfium  # optional: C++ text extraction, much faster than PyPDF2
+except Exception:  # pragma: no cover
+    _pdfium = None
 
-def extract_text_from_pdf(path: str) -> str:
+_WS_RE = re.compile(r"\s+")
+
+# content hash -> chunks, shared by ingest workers; bounded LRU
+_CHUNK_CACHE: "OrderedDict[str, List[str]]" = OrderedDict()
+_CHUNK_CACHE_MAX = 64
+_CHUNK_CACHE_LOCK = threading.Lock()
+
+
+def _page_texts_pdfium(path: str) -> List[str]:
+    pdf = _pdfium.PdfDocument(path)
+    try:
+        texts = []
+        for i in range(len(pdf)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                texts.append(textpage.get_text_range() or "")
+            finally:
+                textpage.close()
+                page.close()
+        return texts
+    finally:
+        pdf.close()
+
+
+def _page_texts_pypdf2(path: str) -> List[str]:
     reader = PdfReader(path)
     texts = []
     for page in reader.pages:
@@ -12,25 +43,60 @@ def extract_text_from_pdf(path: str) -> str:
         except Exception:
             t = ""
         texts.append(t)
+    return texts
+
+
+def extract_text_from_pdf(path: str) -> str:
+    texts = None
+    if _pdfium is not None:
+        try:
+            texts = _page_texts_pdfium(path)
+        except Exception:
+            texts = None
+    if texts is None:
+        texts = _page_texts_pypdf2(path)
     text = "\n".join(texts)
     # Normalize whitespace
-    text = re.sub(r"\s+", " ", text).strip()
+    text = _WS_RE.sub(" ", text).strip()
     return text
 
 
 def chunk_text(text: str, max_chars: int = 1000, overlap: int = 100) -> List[str]:
     if not text:
         return []
-    chunks = []
-    start = 0
     n = len(text)
+    step = max(1, max_chars - overlap)
+    # Chunk count is known up front, so fill a preallocated list by index
+    count = 1 + max(0, (n - max_chars + step - 1) // step)
+    chunks: List[str] = [""] * count
+    i = 0
+    start = 0
     while start < n:
         end = min(start + max_chars, n)
-        chunk = text[start:end]
-        chunks.append(chunk)
+        chunks[i] = text[start:end]
+        i += 1
         if end == n:
             break
-        start = end - overlap
-        if start < 0:
-            start = 0
-    return chunks
+        start += step
+    return chunks[:i] if i < count else chunks
+
+
+def extract_and_chunk_cached(content_hash: str, path: str) -> List[str]:
+    """Extract and chunk a PDF, memoized by content hash so re-uploads skip parsing.
+
+    Safe to call from worker threads. The path is not part of the key;
+    identical bytes saved under another product id reuse the earlier result.
+    """
+    with _CHUNK_CACHE_LOCK:
+        chunks = _CHUNK_CACHE.get(content_hash)
+        if chunks is not None:
+            _CHUNK_CACHE.move_to_end(content_hash)
+            return list(chunks)
+    # Parse outside the lock so concurrent ingests of different files don't serialize
+    chunks = chunk_text(extract_text_from_pdf(path))
+    with _CHUNK_CACHE_LOCK:
+        _CHUNK_CACHE[content_hash] = chunks
+        _CHUNK_CACHE.move_to_end(content_hash)
+        while len(_CHUNK_CACHE) > _CHUNK_CACHE_MAX:
+            _CHUNK_CACHE.popitem(last=False)
+    return list(chunks)
@@ -1,65 +1,181 @@
 import os
-import json
+import hashlib
+import threading
+from functools import lru_cache
 from typing import List, Dict
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import joblib  # installed with scikit-learn
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+
+from lib import jsonio
+
+# Stateless and shared by every product: hashed term counts need no fit and no vocabulary
+_HASHER = HashingVectorizer(n_features=2 ** 18, alternate_sign=False, norm=None, stop_words="english")
+# Bump when the persisted index layout changes so stale artifacts are rebuilt
+_INDEX_FORMAT = 3
+
+
+def _make_qvec(vectorizer):
+    """Per-index memo of question -> L2-normalized TF-IDF row.
+
+    Bound to one fitted transformer, so a rebuilt index gets a fresh cache and
+    vectors built against older IDF weights can never be returned for it.
+    The returned sparse rows are shared between callers and must not be mutated.
+    """
+    @lru_cache(maxsize=1024)
+    def qvec(question: str):
+        return vectorizer.transform(_HASHER.transform([question]))
+    return qvec
+
+
+def _top_k(sims: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first, via an O(n) partition instead of a full sort."""
+    k = min(max(top_k, 1), sims.size)
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    part = np.argpartition(-sims, k - 1)[:k]
+    return part[np.argsort(-sims[part], kind="stable")]
 
 
 class Retriever:
     def __init__(self, text_dir: str):
         self.text_dir = text_dir
         os.makedirs(self.text_dir, exist_ok=True)
-        # in-memory cache: product_id -> {"chunks": List[str], "vectorizer": TfidfVectorizer, "matrix": csr_matrix}
+        # in-memory cache: product_id -> {"chunks": List[str], "vectorizer": TfidfTransformer, "matrix_norm": csr_matrix, "sig": str, "qvec": callable}
         self._cache: Dict[str, Dict] = {}
+        # Shared across Streamlit sessions; guards index writes and cache fills
+        self._lock = threading.Lock()
 
     def _chunks_path(self, product_id: str) -> str:
         return os.path.join(self.text_dir, f"{product_id}.json")
 
+    def _index_path(self, product_id: str) -> str:
+        return os.path.join(self.text_dir, f"{product_id}.idx.joblib")
+
+    def _chunks_sig(self, product_id: str):
+        """Content hash of the chunks file, or None if it cannot be read."""
+        try:
+            with open(self._chunks_path(product_id), "rb") as f:
+                return hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+        except OSError:
+            return None
+
     def index_product(self, product_id: str, chunks: List[str]):
-        # Persist chunks
-        with open(self._chunks_path(product_id), "w", encoding="utf-8") as f:
-            json.dump(chunks, f, ensure_ascii=False, indent=2)
-        # Build index in memory
-        self._build_index(product_id, chunks)
+        with self._lock:
+            # Persist chunks
+            jsonio.dump_file(chunks, self._chunks_path(product_id))
+            sig = self._chunks_sig(product_id)
+            entry = self._cache.get(product_id)
+            if entry is not None and sig is not None and entry["sig"] == sig:
+                # Same content as the index already in memory (and on disk)
+                return
+            # Build index in memory and persist it so cold starts can skip the fit
+            self._build_index(product_id, chunks, sig)
+            self._save_index(product_id)
 
     def _load_chunks(self, product_id: str) -> List[str]:
         path = self._chunks_path(product_id)
         if not os.path.exists(path):
             return []
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return jsonio.load_file(path)
         except Exception:
             return []
 
-    def _build_index(self, product_id: str, chunks: List[str]):
-        vectorizer = TfidfVectorizer(stop_words="english")
+    def _build_index(self, product_id: str, chunks: List[str], sig=None):
+        # Only the IDF weights are fitted; TfidfTransformer L2-normalizes rows, so
+        # cosine similarity is a single sparse dot product
+        vectorizer = TfidfTransformer(norm="l2")
         if not chunks:
             # Avoid fitting empty
             chunks = [""]
-        matrix = vectorizer.fit_transform(chunks)
+        matrix_norm = vectorizer.fit_transform(_HASHER.transform(chunks))
+        self._set_entry(product_id, chunks, vectorizer, matrix_norm, sig)
+
+    def _set_entry(self, product_id: str, chunks: List[str], vectorizer, matrix_norm, sig):
         self._cache[product_id] = {
             "chunks": chunks,
             "vectorizer": vectorizer,
-            "matrix": matrix,
+            "matrix_norm": matrix_norm,
+            "sig": sig,
+            "qvec": _make_qvec(vectorizer),
         }
 
+    def _save_index(self, product_id: str):
+        entry = self._cache[product_id]
+        try:
+            joblib.dump(
+                {
+                    "format": _INDEX_FORMAT,
+                    "sig": entry["sig"],
+                    "vectorizer": entry["vectorizer"],
+                    "matrix_norm": entry["matrix_norm"],
+                    "chunks": entry["chunks"],
+                },
+                self._index_path(product_id),
+            )
+        except Exception:
+            pass
+
+    def _load_index(self, product_id: str, sig) -> bool:
+        """Load a persisted index if it was built from chunks with signature ``sig``."""
+        idx_path = self._index_path(product_id)
+        try:
+            if sig is None or not os.path.exists(idx_path):
+                return False
+            data = joblib.load(idx_path)
+            if data.get("format") != _INDEX_FORMAT or data.get("sig") != sig:
+                return False
+            self._set_entry(product_id, data["chunks"], data["vectorizer"], data["matrix_norm"], sig)
+            return True
+        except Exception:
+            return False
+
     def _ensure_index(self, product_id: str):
         if product_id in self._cache:
             return
-        chunks = self._load_chunks(product_id)
-        self._build_index(product_id, chunks)
+        with self._lock:
+            if product_id in self._cache:
+                return
+            sig = self._chunks_sig(product_id)
+            if self._load_index(product_id, sig):
+                return
+            chunks = self._load_chunks(product_id)
+            self._build_index(product_id, chunks, sig)
+            # A missing chunks file or empty placeholder index is not worth persisting
+            if sig is not None and chunks:
+                self._save_index(product_id)
 
     def query(self, product_id: str, question: str, top_k: int = 3) -> List[Dict]:
         self._ensure_index(product_id)
         entry = self._cache.get(product_id)
         if not entry:
             return []
-        vec = entry["vectorizer"].transform([question])
-        sims = cosine_similarity(vec, entry["matrix"]).flatten()
+        # The entry is one snapshot, so the vector always matches this matrix
+        vec = entry["qvec"](question)
+        sims = (entry["matrix_norm"] @ vec.T).toarray().ravel()
+        return self._hits(entry, sims, top_k)
+
+    def query_batch(self, product_id: str, questions: List[str], top_k: int = 3) -> List[List[Dict]]:
+        """Answer several questions against one product with a single transform and matmul.
+
+        Returns one result list per question, in the same shape as ``query``.
+        """
+        if not questions:
+            return []
+        self._ensure_index(product_id)
+        entry = self._cache.get(product_id)
+        if not entry:
+            return [[] for _ in questions]
+        q = entry["vectorizer"].transform(_HASHER.transform(list(questions)))
+        scores = (q @ entry["matrix_norm"].T).toarray()
+        return [self._hits(entry, row, top_k) for row in scores]
+
+    @staticmethod
+    def _hits(entry: Dict, sims: np.ndarray, top_k: int) -> List[Dict]:
         # Get top_k indices
-        idxs = sims.argsort()[::-1][:max(top_k, 1)]
+        idxs = _top_k(sims, top_k)
         results: List[Dict] = []
         for i in idxs:
             results.append({
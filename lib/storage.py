@@ -1,29 +1,53 @@
 import os
-import json
+import threading
 from typing import List, Dict, Optional
 
+from lib import jsonio
+
 class ProductStore:
     def __init__(self, data_dir: str):
         self.data_dir = data_dir
         os.makedirs(self.data_dir, exist_ok=True)
         self.products_path = os.path.join(self.data_dir, "products.json")
+        # Shared across Streamlit sessions (one thread each); serializes read-modify-write cycles
+        self._lock = threading.Lock()
+        # Parsed products.json, reused until the file's mtime/size changes on disk
+        self._cached: Optional[List[Dict]] = None
+        self._by_id: Dict[str, Dict] = {}
+        self._stamp = None
         if not os.path.exists(self.products_path):
-            with open(self.products_path, "w", encoding="utf-8") as f:
-                json.dump([], f)
+            jsonio.dump_file([], self.products_path)
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.products_path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _remember(self, products: List[Dict], stamp):
+        self._by_id = {p.get("id"): p for p in products}
+        self._cached = products
+        self._stamp = stamp
 
     def _load(self) -> List[Dict]:
+        """Return the cached product list, re-parsing only when the file changed. Do not mutate."""
+        stamp = self._file_stamp()
+        if self._cached is not None and stamp is not None and stamp == self._stamp:
+            return self._cached
         try:
-            with open(self.products_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            products = jsonio.load_file(self.products_path)
         except Exception:
             return []
+        self._remember(products, stamp)
+        return products
 
     def _save(self, products: List[Dict]):
-        with open(self.products_path, "w", encoding="utf-8") as f:
-            json.dump(products, f, ensure_ascii=False, indent=2)
+        jsonio.dump_file(products, self.products_path)
+        self._remember(products, self._file_stamp())
 
     def list(self) -> List[Dict]:
-        return self._load()
+        return list(self._load())
 
     def get_by_name(self, name: str) -> Optional[Dict]:
         name_lower = name.strip().lower()
@@ -33,24 +57,36 @@ class ProductStore:
         return None
 
     def get(self, product_id: str) -> Optional[Dict]:
-        for p in self._load():
-            if p.get("id") == product_id:
-                return p
-        return None
+        self._load()
+        return self._by_id.get(product_id)
 
     def upsert(self, product: Dict):
-        products = self._load()
-        found = False
-        for i, p in enumerate(products):
-            if p.get("id") == product.get("id"):
-                products[i] = product
-                found = True
-                break
-        if not found:
-            products.append(product)
-        self._save(products)
+        self.bulk_upsert([product])
 
     def delete(self, product_id: str):
-        products = self._load()
-        products = [p for p in products if p.get("id") != product_id]
-        self._save(products)
+        self.bulk_delete([product_id])
+
+    def bulk_upsert(self, products: List[Dict]):
+        """Insert or replace several products with a single read and write of the store."""
+        if not products:
+            return
+        with self._lock:
+            current = list(self._load())
+            index = {p.get("id"): i for i, p in enumerate(current)}
+            for product in products:
+                i = index.get(product.get("id"))
+                if i is None:
+                    index[product.get("id")] = len(current)
+                    current.append(product)
+                else:
+                    current[i] = product
+            self._save(current)
+
+    def bulk_delete(self, product_ids: List[str]):
+        """Remove several products with a single read and write of the store."""
+        ids = set(product_ids)
+        if not ids:
+            return
+        with self._lock:
+            products = [p for p in self._load() if p.get("id") not in ids]
+            self._save(products)